@@ -1,45 +1,41 @@
 # flake8: noqa # pylint: skip-file
 from __future__ import unicode_literals
 
-from django.db import transaction
 from django.apps import AppConfig
+from django.db import DatabaseError
+from django.db.models.signals import post_migrate
 
 
 
+def reconcile_master_key_handler(sender, **kwargs):
+    """Reconcile the master key user after migrating.
+
+    Workers never touch the master key on startup, see api.models.master.
+    """
+    from django.conf import settings
+    from api.models.master import reconcile_master_key
+
+    try:
+        deleted_count, created = reconcile_master_key(
+            settings.MASTER_PUBLIC_KEY
+        )
+    except (ValueError, DatabaseError) as exception:
+        print "Could not reconcile master key: " + str(exception)
+        return
+    if deleted_count != 0:
+        print "Deleted spurious master key(s)"
+    if created:
+        print "Created master key"
+
+
 class ApiConfig(AppConfig):
     name = 'api'
 
     def ready(self):
-        from django.conf import settings
-
-        from api.models.util import get_master_user
-        from api.models.util import get_lock
-        from api.models.util import parse_key
-        from api.models import PublicKey
-        # Try to set up our master user, this fails under makemigrations.
-        try:
-            master_key = settings.MASTER_PUBLIC_KEY
-            # Try to parse the master key (exception if invalid)
-            parse_key(master_key)
-
-            with transaction.atomic(savepoint=True):
-                # Ensure our master key user exists
-                user = get_master_user()
-                # Acquire lock on master key user
-                lock = get_lock()
-                # Delete all keys, which aren't the master key
-                deleted_count, del_dict = PublicKey.objects.filter(
-                    user=user
-                ).exclude(key=master_key).delete()
-                key, created = PublicKey.objects.get_or_create(
-                    user=user,
-                    key=master_key
-                )
-                if deleted_count != 0:
-                    print "Deleted spurious master key(s)"
-                if created:
-                    print "Created master key"
-        except Exception as exception:
-            print str(exception)
-            # TODO: Log exception
-            pass
+        # Register signal handlers
+        import api.models.recipients
+        import api.models.vault
+        import api.models.changes
+        import api.models.access
+
+        post_migrate.connect(reconcile_master_key_handler, sender=self)
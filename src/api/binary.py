@@ -0,0 +1,90 @@
+"""MessagePack renderer and parser, carrying binary data as raw bytes.
+
+In JSON, ciphertexts and signatures are base64 encoded, which makes up the
+bulk of every payload. With :code:`Accept: application/msgpack` responses
+are rendered as MessagePack instead, and with
+:code:`Content-Type: application/msgpack` requests are parsed as such. In
+both directions :code:`Base64Field` values are carried as raw bytes (the
+MessagePack bin type), while all other strings remain text.
+"""
+from __future__ import unicode_literals
+
+import msgpack
+
+from django.conf import settings
+from django.utils import six
+
+from rest_framework import renderers
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+MEDIA_TYPE = 'application/msgpack'
+
+
+def renders_binary(context):
+    """Check whether the response of the serializer 'context' is binary."""
+    request = context.get('request')
+    renderer = getattr(request, 'accepted_renderer', None)
+    return isinstance(renderer, MessagePackRenderer)
+
+
+def parses_binary(context):
+    """Check whether the request of the serializer 'context' is binary."""
+    request = context.get('request')
+    content_type = getattr(request, 'content_type', None) or ''
+    return content_type.split(';')[0].strip() == MEDIA_TYPE
+
+
+def _prepare(data):
+    """Convert rendered 'data' to the types to pack it as.
+
+    :code:`Base64Field` renders raw bytes as :code:`bytearray`, which are
+    packed as bytes. Other byte strings are text in Python 2, such as the
+    output of :code:`reverse`, and are packed as text.
+    """
+    if isinstance(data, dict):
+        return dict(
+            (_prepare(key), _prepare(value))
+            for key, value in data.items()
+        )
+    if isinstance(data, (list, tuple)):
+        return [_prepare(value) for value in data]
+    if isinstance(data, bytearray):
+        return six.binary_type(data)
+    if isinstance(data, six.binary_type):
+        return data.decode(settings.DEFAULT_CHARSET)
+    return data
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Render responses as MessagePack."""
+
+    media_type = MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(
+            _prepare(data),
+            use_bin_type=True,
+            # Lazy translations, decimals, dates and so on, as in JSON
+            default=encoders.JSONEncoder().default
+        )
+
+
+class MessagePackParser(parsers.BaseParser):
+    """Parse MessagePack requests."""
+
+    media_type = MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as error:
+            raise ParseError('MessagePack parse error - %s' % six.text_type(
+                error
+            ))
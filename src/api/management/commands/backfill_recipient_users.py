@@ -0,0 +1,65 @@
+# pylint: disable=W9903
+"""Command for filling in the recipient user of passwords."""
+from django.db import transaction
+from django.db.models import OuterRef
+from django.db.models import Subquery
+from django.core.management.base import BaseCommand
+from django.utils.encoding import smart_text
+
+from api.models import Password
+from api.models import PublicKey
+
+
+class Command(BaseCommand):
+    """Fill in the recipient user of passwords which have none.
+
+    Passwords created before :code:`Password.recipient_user` was introduced
+    have no recipient user, and are not listed until it is filled in. This
+    command copies it from the public keys, in batches of passwords, each
+    batch a single UPDATE in its own transaction. The command is idempotent.
+
+    Examples:
+
+        .. code:: console
+
+            $ python manage.py backfill_recipient_users
+
+            Backfilled 3141 passwords
+    """
+
+    help = 'Fill in missing password recipient users'
+
+    def add_arguments(self, parser):
+        """Setup arguments to accept for this command."""
+        parser.add_argument('--batch-size',
+                            help='number of rows per transaction',
+                            type=int,
+                            default=1000)
+
+    def handle(self, *args, **options):
+        """Walk the passwords without recipients in pk order."""
+        batch_size = options['batch_size']
+        owner = PublicKey.objects.filter(
+            pk=OuterRef('public_key_id')
+        ).values('user_id')[:1]
+        last_pk = 0
+        backfilled = 0
+        while True:
+            pks = list(
+                Password.objects.filter(
+                    pk__gt=last_pk, recipient_user__isnull=True
+                ).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+
+            with transaction.atomic():
+                # Update bypasses save, and thereby the pre_save hooks
+                backfilled += Password.objects.filter(pk__in=pks).update(
+                    recipient_user_id=Subquery(owner)
+                )
+
+        self.stdout.write(
+            "Backfilled " + smart_text(backfilled) + " passwords"
+        )
@@ -0,0 +1,93 @@
+# pylint: disable=W9903
+"""Command for converting base64 encoded passwords to raw binary."""
+import base64
+import binascii
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.encoding import smart_text
+
+from api.models import Password
+from api.models import util
+
+
+BASE64_PATTERN = re.compile(b'^[A-Za-z0-9+/]+={0,2}$')
+"""Pattern matching values, which are still base64 encoded."""
+
+
+def decode_if_encoded(value):
+    """Decode 'value' if it is still base64 encoded, otherwise return None.
+
+    Raw ciphertexts and signatures are random bytes, and will not consist of
+    only base64 characters, in practice.
+    """
+    value = util.to_bytes(value)
+    if len(value) % 4 != 0 or not BASE64_PATTERN.match(value):
+        return None
+    try:
+        return base64.b64decode(value)
+    except (TypeError, ValueError, binascii.Error):
+        return None
+
+
+class Command(BaseCommand):
+    """Convert password rows from base64 encoded text to raw binary.
+
+    Passwords and signatures used to be stored as base64 encoded text. After
+    migrating the columns to binary, the existing rows still hold the encoded
+    text, which this command decodes in place. The command is idempotent, rows
+    which are already binary are left untouched.
+
+    Examples:
+
+        .. code:: console
+
+            $ python manage.py convert_passwords --batch-size 1000
+
+            Converted 2718 of 3141 passwords
+    """
+
+    help = 'Convert base64 encoded passwords and signatures to raw binary'
+
+    def add_arguments(self, parser):
+        """Setup arguments to accept for this command."""
+        parser.add_argument('--batch-size',
+                            help='number of rows per transaction',
+                            type=int,
+                            default=1000)
+
+    def handle(self, *args, **options):
+        """Walk the passwords in pk order, converting a batch at a time."""
+        batch_size = options['batch_size']
+        last_pk = 0
+        converted = 0
+        total = 0
+        while True:
+            rows = list(
+                Password.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'password', 'signature'
+                )[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            total += len(rows)
+
+            with transaction.atomic():
+                for pk, password, signature in rows:
+                    binary_password = decode_if_encoded(password)
+                    binary_signature = decode_if_encoded(signature)
+                    if binary_password is None or binary_signature is None:
+                        continue
+                    # Update bypasses save, and thereby the pre_save hooks
+                    Password.objects.filter(pk=pk).update(
+                        password=binary_password,
+                        signature=binary_signature
+                    )
+                    converted += 1
+
+        self.stdout.write(
+            "Converted " + smart_text(converted) + " of " + smart_text(total) +
+            " passwords"
+        )
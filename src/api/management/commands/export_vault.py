@@ -0,0 +1,47 @@
+# pylint: disable=W9903
+"""Command for exporting the vault as newline-delimited JSON."""
+import io
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.models import dump
+
+
+class Command(BaseCommand):
+    """Write every key entry and password as newline-delimited JSON.
+
+    See :code:`api.models.dump` for the format. The dump is streamed in
+    chunks, such that memory use stays flat regardless of the vault size.
+
+    Examples:
+
+        .. code:: console
+
+            $ python manage.py export_vault --output vault.ndjson
+
+            $ python manage.py export_vault | gzip > vault.ndjson.gz
+    """
+
+    help = 'Export all key entries and passwords as newline-delimited JSON'
+
+    def add_arguments(self, parser):
+        """Setup arguments to accept for this command."""
+        parser.add_argument('--output',
+                            help='file to write to, defaults to stdout')
+        parser.add_argument('--chunk-size',
+                            help='number of key entries to load per query',
+                            type=int,
+                            default=getattr(
+                                settings, 'EXPORT_CHUNK_SIZE', 1000
+                            ))
+
+    def handle(self, *args, **options):
+        """Stream the dump to the output."""
+        lines = dump.export_lines(chunk_size=options['chunk_size'])
+        if options['output'] is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with io.open(options['output'], 'w', encoding='utf-8') as output:
+            output.writelines(lines)
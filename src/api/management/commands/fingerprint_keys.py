@@ -0,0 +1,66 @@
+# pylint: disable=W9903
+"""Command for filling in missing public key fingerprints."""
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError
+from django.db import transaction
+from django.utils.encoding import smart_text
+
+from api.models import PublicKey
+from api.models import util
+
+
+class Command(BaseCommand):
+    """Fill in the fingerprint of public keys which have none.
+
+    Keys uploaded before fingerprints were introduced have no fingerprint.
+    This command computes them in batches. Keys which duplicate another key
+    cannot be fingerprinted, due to the unique index, and are reported.
+
+    Examples:
+
+        .. code:: console
+
+            $ python manage.py fingerprint_keys
+
+            Fingerprinted 42 public keys
+    """
+
+    help = 'Fill in missing public key fingerprints'
+
+    def add_arguments(self, parser):
+        """Setup arguments to accept for this command."""
+        parser.add_argument('--batch-size',
+                            help='number of rows per transaction',
+                            type=int,
+                            default=1000)
+
+    def handle(self, *args, **options):
+        """Walk the unfingerprinted keys in pk order, a batch at a time."""
+        batch_size = options['batch_size']
+        last_pk = 0
+        updated = 0
+        while True:
+            rows = list(
+                PublicKey.objects.filter(
+                    pk__gt=last_pk, fingerprint__isnull=True
+                ).order_by('pk').values_list('pk', 'key')[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            for pk, key in rows:
+                try:
+                    with transaction.atomic():
+                        PublicKey.objects.filter(pk=pk).update(
+                            fingerprint=util.fingerprint(key)
+                        )
+                    updated += 1
+                except (ValueError, IntegrityError):
+                    self.stderr.write(
+                        "Unable to fingerprint public key " + smart_text(pk)
+                    )
+
+        self.stdout.write(
+            "Fingerprinted " + smart_text(updated) + " public keys"
+        )
@@ -0,0 +1,190 @@
+# pylint: disable=W9903
+"""Command for importing a vault dump."""
+import io
+import itertools
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import DatabaseError
+from django.db import transaction
+from django.utils.encoding import smart_text
+
+from api.models import PublicKey
+from api.models import dump
+from api.models.bulk import insert_key_entries
+from api.models.bulk import insert_passwords
+from api.models.verify import start_pool
+from api.models.verify import verify_signatures
+
+
+def iter_chunks(entries, batch_size):
+    """Group 'entries' into chunks of at least 'batch_size' records.
+
+    Chunks always end at a key entry boundary, such that the passwords of a
+    key entry are committed along with it.
+    """
+    chunk = []
+    records = 0
+    for entry, passwords in entries:
+        chunk.append((entry, passwords))
+        records += 1 + len(passwords)
+        if records >= batch_size:
+            yield chunk, records
+            chunk = []
+            records = 0
+    if chunk:
+        yield chunk, records
+
+
+class Command(BaseCommand):
+    """Load a vault dump, as written by :code:`export_vault`.
+
+    The dump is read as a stream, from a file or stdin, and loaded in chunks
+    of at least :code:`--batch-size` records using bulk inserts, committing
+    each chunk in its own transaction. After every chunk the number of
+    records committed so far is reported, if a load fails it can be resumed
+    from there using :code:`--offset`.
+
+    Examples:
+
+        .. code:: console
+
+            $ python manage.py import_vault vault.ndjson --batch-size 5000
+
+            Committed 5012 records (3391 rows/s)
+            ...
+            Imported 210000 records in 61.9 seconds (3392 rows/s)
+
+            $ gunzip -c vault.ndjson.gz | python manage.py import_vault
+    """
+
+    help = 'Import key entries and passwords from an NDJSON or CSV dump'
+
+    def add_arguments(self, parser):
+        """Setup arguments to accept for this command."""
+        parser.add_argument('input',
+                            nargs='?',
+                            default='-',
+                            help='file to read, defaults to stdin')
+        parser.add_argument('--format',
+                            choices=('ndjson', 'csv'),
+                            help='dump format, guessed from the file name')
+        parser.add_argument('--batch-size',
+                            help='number of records per transaction',
+                            type=int,
+                            default=1000)
+        parser.add_argument('--offset',
+                            help='number of records to skip, to resume',
+                            type=int,
+                            default=0)
+        parser.add_argument('--no-verify',
+                            help='skip verifying the password signatures',
+                            action='store_false',
+                            dest='verify')
+        parser.add_argument('--workers',
+                            help='number of processes to verify with',
+                            type=int,
+                            default=None)
+
+    def handle(self, *args, **options):
+        """Load the dump a chunk at a time, reporting the progress."""
+        if options['verify']:
+            start_pool(options['workers'])
+        dump_format = options['format']
+        if dump_format is None:
+            dump_format = 'ndjson'
+            if options['input'].endswith('.csv'):
+                dump_format = 'csv'
+
+        if options['input'] == '-':
+            stream = sys.stdin
+        else:
+            stream = io.open(options['input'], 'rb')
+
+        reader = dump.read_csv if dump_format == 'csv' else dump.read_ndjson
+        records = itertools.islice(reader(stream), options['offset'], None)
+
+        offset = options['offset']
+        imported = 0
+        start = time.time()
+        try:
+            for chunk, count in iter_chunks(
+                    dump.group_entries(records), options['batch_size']):
+                self.import_chunk(chunk, options['verify'])
+                offset += count
+                imported += count
+                self.stdout.write(
+                    "Committed " + smart_text(offset) + " records (" +
+                    smart_text(self.rate(imported, start)) + " rows/s)"
+                )
+        except (ValueError, KeyError, TypeError, ValidationError,
+                DatabaseError) as error:
+            raise CommandError(
+                "Import failed after " + smart_text(offset) + " records, " +
+                "resume using --offset " + smart_text(offset) + ": " +
+                smart_text(error)
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(
+            "Imported " + smart_text(imported) + " records in " +
+            "{:.1f}".format(time.time() - start) + " seconds (" +
+            smart_text(self.rate(imported, start)) + " rows/s)"
+        )
+
+    @staticmethod
+    def rate(records, start):
+        """Records per second since 'start'."""
+        return int(records / max(time.time() - start, 1e-6))
+
+    def import_chunk(self, chunk, verify):
+        """Insert the key entries and passwords of 'chunk' in a transaction.
+
+        Raises:
+            ValueError: If any signature does not check out.
+            ValidationError: If any key entry is invalid.
+        """
+        with transaction.atomic():
+            key_entries = [dump.build_key_entry(entry) for entry, _ in chunk]
+            for keyentry in key_entries:
+                keyentry.clean_fields(exclude=['owner'])
+            insert_key_entries(key_entries)
+
+            password_records = []
+            passwords = []
+            for keyentry, (_, records) in zip(key_entries, chunk):
+                for record in records:
+                    password_records.append(record)
+                    passwords.append(dump.build_password(record, keyentry))
+            if verify:
+                self.verify_passwords(password_records, passwords)
+            insert_passwords(passwords)
+
+    @staticmethod
+    def verify_passwords(records, passwords):
+        """Verify the signatures of 'passwords' as one batch.
+
+        Raises:
+            ValueError: Listing the dumped ids of the invalid passwords.
+        """
+        signing_keys = PublicKey.objects.in_bulk(
+            set(password.signing_key_id for password in passwords)
+        )
+        results = verify_signatures(
+            (signing_keys[password.signing_key_id].key,
+             password.password, password.signature)
+            for password in passwords
+        )
+        failed = [
+            record['id']
+            for record, error in zip(records, results) if error is not None
+        ]
+        if failed:
+            raise ValueError(
+                "Invalid signatures on passwords: " + smart_text(failed)
+            )
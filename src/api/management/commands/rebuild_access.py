@@ -0,0 +1,57 @@
+# pylint: disable=W9903
+"""Command for rebuilding the materialized key entry access table."""
+from django.core.management.base import BaseCommand
+from django.utils.encoding import smart_text
+
+from api.models import KeyEntry
+from api.models.access import rebuild_access
+
+
+class Command(BaseCommand):
+    """Rebuild :code:`KeyEntryAccess` from the passwords.
+
+    The access table is kept current by signal handlers, but may drift, for
+    instance if passwords are changed with raw SQL or bulk operations, which
+    do not send signals. This command recomputes it in batches of key
+    entries, each batch in its own transaction.
+
+    Examples:
+
+        .. code:: console
+
+            $ python manage.py rebuild_access
+
+            Rebuilt 3141 access rows for 1000 key entries
+    """
+
+    help = 'Rebuild the key entry access table from the passwords'
+
+    def add_arguments(self, parser):
+        """Setup arguments to accept for this command."""
+        parser.add_argument('--batch-size',
+                            help='number of key entries per transaction',
+                            type=int,
+                            default=1000)
+
+    def handle(self, *args, **options):
+        """Walk the key entries in pk order, a batch at a time."""
+        batch_size = options['batch_size']
+        last_pk = 0
+        key_entries = 0
+        rows = 0
+        while True:
+            pks = list(
+                KeyEntry.objects.filter(pk__gt=last_pk).order_by(
+                    'pk'
+                ).values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            key_entries += len(pks)
+            rows += rebuild_access(pks)
+
+        self.stdout.write(
+            "Rebuilt " + smart_text(rows) + " access rows for " +
+            smart_text(key_entries) + " key entries"
+        )
@@ -0,0 +1,49 @@
+# pylint: disable=W9903
+"""Command for reconciling the master key user with the settings."""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils.encoding import smart_text
+
+from api.models.master import reconcile_master_key
+
+
+class Command(BaseCommand):
+    """Ensure the master key user holds exactly :code:`MASTER_PUBLIC_KEY`.
+
+    Reconciliation also runs after every :code:`migrate`, this command is
+    for changing the master key without migrating. It is idempotent, and
+    does no writes when the master key is already current.
+
+    Examples:
+
+        .. code:: console
+
+            $ python manage.py reconcile_master_key
+
+            Deleted 1 spurious master key(s)
+            Created master key
+    """
+
+    help = 'Reconcile the master key user with MASTER_PUBLIC_KEY'
+
+    def handle(self, *args, **options):
+        """Reconcile, and report the changes made."""
+        try:
+            deleted_count, created = reconcile_master_key(
+                settings.MASTER_PUBLIC_KEY
+            )
+        except ValueError as exception:
+            raise CommandError(
+                "Invalid MASTER_PUBLIC_KEY: " + smart_text(exception)
+            )
+
+        if deleted_count != 0:
+            self.stdout.write(
+                "Deleted " + smart_text(deleted_count) +
+                " spurious master key(s)"
+            )
+        if created:
+            self.stdout.write("Created master key")
+        if deleted_count == 0 and not created:
+            self.stdout.write("Master key is current")
@@ -0,0 +1,79 @@
+"""Django Model."""
+from __future__ import unicode_literals
+from django.utils.encoding import python_2_unicode_compatible
+from django.utils.encoding import smart_text
+from django.contrib.auth import get_user_model
+
+from django.utils.translation import ugettext_lazy as _lazy
+from django.db import models
+from django.utils import timezone
+
+from core import validation
+
+
+@python_2_unicode_compatible
+class Change(models.Model):
+    """Entry in the change log of key entries and passwords.
+
+    The change log allows clients to synchronize by fetching only what has
+    changed since the last change they saw, including tombstones for deleted
+    objects. Every change is recorded once for staff, and once for every user
+    it concerns, such that users only learn of key entries they can see.
+    """
+
+    KEY_ENTRY = 'keyentry'
+    PASSWORD = 'password'
+    MODEL_CHOICES = (
+        (KEY_ENTRY, _lazy("key entry")),
+        (PASSWORD, _lazy("password")),
+    )
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = (
+        (UPSERT, _lazy("created or updated")),
+        (DELETE, _lazy("deleted")),
+    )
+
+    class Meta:
+        verbose_name = _lazy("change")
+        verbose_name_plural = _lazy("changes")
+        index_together = ("user", "sequence")
+
+    id = models.BigAutoField(primary_key=True)
+    """Insertion order, which is not the order changes are committed in."""
+
+    sequence = models.BigIntegerField(null=True, blank=True, db_index=True)
+    """Synchronization token, assigned in commit order, None until then.
+
+    See :code:`api.models.changes.sequence_changes`.
+    """
+
+    model = models.CharField(max_length=16, choices=MODEL_CHOICES)
+    """Kind of object which changed."""
+
+    object_id = models.IntegerField()
+    """Primary key of the object which changed."""
+
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES)
+    """Whether the object was created / updated or deleted."""
+
+    user = models.ForeignKey(
+        get_user_model(),
+        related_name="+",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE
+    )
+    """User the change is visible to, or None for staff."""
+
+    created = models.DateTimeField(default=timezone.now)
+    """Time of the change."""
+
+    def __str__(self):
+        return (smart_text(self.action) + " of " + smart_text(self.model) +
+                " " + smart_text(self.object_id))
+
+
+# Only written by signal handlers and bulk operations
+validation.register(Change, validation.NO_VALIDATION)
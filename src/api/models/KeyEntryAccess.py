@@ -0,0 +1,53 @@
+"""Django Model."""
+from __future__ import unicode_literals
+from django.utils.encoding import python_2_unicode_compatible
+from django.utils.encoding import smart_text
+from django.contrib.auth import get_user_model
+
+from django.utils.translation import ugettext_lazy as _lazy
+from django.db import models
+
+from core import validation
+
+from api.models import KeyEntry
+
+
+@python_2_unicode_compatible
+class KeyEntryAccess(models.Model):
+    """Materialized visibility of key entries.
+
+    A user can see a key entry, if the key entry holds a password encrypted
+    for one of their public keys. This table holds one row for every such
+    (user, key entry) pair, such that visibility is a single indexed lookup,
+    instead of a join through passwords and public keys.
+
+    Kept current by the signal handlers in :code:`api.models.access`, and
+    rebuilt by the :code:`rebuild_access` management command.
+    """
+
+    class Meta:
+        verbose_name = _lazy("key entry access")
+        verbose_name_plural = _lazy("key entry accesses")
+        unique_together = ("user", "key_entry")
+
+    user = models.ForeignKey(
+        get_user_model(),
+        related_name="+",
+        on_delete=models.CASCADE
+    )
+    """User who can see the key entry."""
+
+    key_entry = models.ForeignKey(
+        KeyEntry,
+        related_name="accesses",
+        on_delete=models.CASCADE
+    )
+    """Key entry visible to the user."""
+
+    def __str__(self):
+        return ('Access for: ' + smart_text(self.user_id) +
+                ' to: ' + smart_text(self.key_entry_id))
+
+
+# Only written by signal handlers and bulk operations
+validation.register(KeyEntryAccess, validation.NO_VALIDATION)
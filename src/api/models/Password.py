@@ -1,19 +1,20 @@
 """Django Model."""
 from __future__ import unicode_literals
 from django.utils.encoding import python_2_unicode_compatible
+from django.utils.encoding import smart_text
 
-#from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.core.exceptions import ValidationError
 #from django.utils.translation import ugettext as _
 from django.utils.translation import ugettext_lazy as _lazy
 from django.db import models
 # from django.utils import timezone
 #from simple_history.models import HistoricalRecords
 
-import base64
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding
+from core import validation
 
 from api.models import util
+from api.models import verify
 from api.models import KeyEntry
 from api.models import PublicKey
 
@@ -26,9 +27,13 @@ class Password(models.Model):
         verbose_name = _lazy("password")
         verbose_name_plural = _lazy("passwords")
         unique_together = ("key_entry", "public_key")
+        indexes = [
+            # Per user password lookups, see recipient_user
+            models.Index(fields=['recipient_user', 'key_entry']),
+        ]
 
-    password = models.CharField(max_length=util.MAX_LENGTH_NUMBER)
-    """The encrypted password itself (base64 encoded)"""
+    password = models.BinaryField()
+    """The encrypted password itself (raw binary)"""
 
     key_entry = models.ForeignKey(
         KeyEntry,
@@ -44,8 +49,22 @@ class Password(models.Model):
     )
     """Public key this password was encrypted under."""
 
-    signature = models.CharField(max_length=util.MAX_LENGTH_NUMBER)
-    """Signature that was made by the encrypter (base64 encoded)"""
+    recipient_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="+",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False
+    )
+    """Owner of :code:`public_key`, denormalized for per user lookups.
+
+    Set on save, and kept current by :code:`api.models.access`. Rows which
+    predate the field are filled in by :code:`backfill_recipient_users`.
+    """
+
+    signature = models.BinaryField()
+    """Signature that was made by the encrypter (raw binary)"""
 
     signing_key = models.ForeignKey(
         'PublicKey',
@@ -54,21 +73,30 @@ class Password(models.Model):
     )
     """Key that was used to sign this password."""
 
+    def save(self, *args, **kwargs):
+        # Always follows the public key, which may have been changed
+        if self.public_key_id is not None:
+            self.recipient_user_id = self.public_key.user_id
+        super(Password, self).save(*args, **kwargs)
+
     def clean(self):
         """Check that the signature checks out."""
-        binary_password = base64.b64decode(self.password)
-        binary_signature = base64.b64decode(self.signature)
-        self.signing_key.as_key().verify(
-            binary_signature,
-            binary_password,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
+        error = verify.verify_signature(
+            self.signing_key.key,
+            self.password,
+            self.signature
         )
+        if error is not None:
+            raise ValidationError(verify.ERROR_MESSAGES[error])
 
     def __str__(self):
         return ("Password for: " + smart_text(self.key_entry) + 
                 " encrypted by: " + self.signing_key.user.username + 
                 " for: " + self.public_key.user.username)
+
+
+validation.register(Password, validation.ValidationPolicy(
+    # Enforced by the database, and dereferenced by clean and save anyway
+    exclude=['key_entry', 'public_key', 'signing_key', 'recipient_user'],
+    validate_unique=False,
+))
@@ -3,7 +3,7 @@ from __future__ import unicode_literals
 from django.utils.encoding import python_2_unicode_compatible
 from django.contrib.auth import get_user_model
 
-#from django.core.exceptions import ValidationError
+from django.core.exceptions import ValidationError
 #from django.utils.translation import ugettext as _
 from django.utils.translation import ugettext_lazy as _lazy
 from django.db import models
@@ -31,9 +31,22 @@ class PublicKey(models.Model):
         on_delete=models.PROTECT
     )
 
-    # TODO: Consider unique=True for security?
     key = models.CharField(max_length=util.MAX_LENGTH_NUMBER)
 
+    fingerprint = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False
+    )
+    """SHA256 fingerprint of :code:`key`, see :code:`util.fingerprint`.
+
+    Unique, such that the same key cannot be registered twice. Nullable only
+    to allow adding the column to existing tables, see the
+    :code:`fingerprint_keys` command.
+    """
+
     def as_key(self):
         return util.parse_key(self.key)
 
@@ -46,6 +59,18 @@ class PublicKey(models.Model):
         except ValueError as value_error:
             # Here we just rethrow after wrapping
             raise ValidationError(str(value_error))
+        self.fingerprint = util.fingerprint(self.key)
+
+    def save(self, *args, **kwargs):
+        """Ensure the fingerprint is up to date before saving.
+
+        Raises:
+            ValueError: If :code:`key` cannot be parsed, even when validation
+                is skipped, as a key must never be stored without its
+                fingerprint.
+        """
+        self.fingerprint = util.fingerprint(self.key)
+        super(PublicKey, self).save(*args, **kwargs)
 
     def __str__(self):
         return 'User: ' + self.user.username + " " + str(self.pk)
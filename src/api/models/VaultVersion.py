@@ -0,0 +1,92 @@
+"""Django Model."""
+from __future__ import unicode_literals
+from django.utils.encoding import python_2_unicode_compatible
+from django.utils.encoding import smart_text
+from django.contrib.auth import get_user_model
+
+from django.utils.translation import ugettext_lazy as _lazy
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+from core import validation
+
+
+@python_2_unicode_compatible
+class VaultVersion(models.Model):
+    """Version counter of the key entries and passwords visible to a user.
+
+    Bumped whenever anything in the users vault changes, such that clients
+    can do conditional requests, instead of downloading the vault again.
+    """
+
+    class Meta:
+        verbose_name = _lazy("vault version")
+        verbose_name_plural = _lazy("vault versions")
+
+    user = models.OneToOneField(
+        get_user_model(),
+        related_name="vault_version",
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    """User whose vault this is the version of."""
+
+    version = models.BigIntegerField(default=0)
+    """Monotonically increasing version number."""
+
+    modified = models.DateTimeField(default=timezone.now)
+    """Time of the last bump."""
+
+    @classmethod
+    def get_for_user(cls, user_id):
+        """Get the vault version of the user, creating it if required."""
+        vault_version, _ = cls.objects.get_or_create(user_id=user_id)
+        return vault_version
+
+    @classmethod
+    def get_current(cls, user_id):
+        """Get the vault version of the user, without creating it.
+
+        Users without a version get an unsaved initial version, such that
+        reads never write. Their first bump creates it past the initial one.
+        """
+        vault_version = cls.objects.filter(user_id=user_id).first()
+        if vault_version is None:
+            vault_version = cls(user_id=user_id, modified=None)
+        return vault_version
+
+    @classmethod
+    def bump(cls, user_ids):
+        """Bump the vault version of the users in 'user_ids'.
+
+        Users without a version yet get one, past the initial version.
+        """
+        user_ids = set(user_ids)
+        user_ids.discard(None)
+        bumped_count = cls.objects.filter(user_id__in=user_ids).update(
+            version=F('version') + 1,
+            modified=timezone.now()
+        )
+        if bumped_count == len(user_ids):
+            return
+        existing = cls.objects.filter(
+            user_id__in=user_ids
+        ).values_list('user_id', flat=True)
+        for user_id in user_ids.difference(existing):
+            cls.objects.get_or_create(user_id=user_id, defaults={
+                'version': 1,
+            })
+
+    @property
+    def etag(self):
+        """ETag identifying this version of the users vault."""
+        return smart_text(self.user_id) + '-' + smart_text(self.version)
+
+    def __str__(self):
+        return ('Vault of: ' + smart_text(self.user_id) +
+                ' at version: ' + smart_text(self.version))
+
+
+# Only written by signal handlers and bulk operations
+validation.register(VaultVersion, validation.NO_VALIDATION)
@@ -1,3 +1,6 @@
 from api.models.KeyEntry import KeyEntry
 from api.models.Password import Password
 from api.models.PublicKey import PublicKey
+from api.models.VaultVersion import VaultVersion
+from api.models.Change import Change
+from api.models.KeyEntryAccess import KeyEntryAccess
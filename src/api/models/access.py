@@ -0,0 +1,130 @@
+"""Signal handlers keeping :code:`KeyEntryAccess` up to date.
+
+Access follows from the passwords of a key entry, and the owners of the
+public keys they are encrypted for. Saving or deleting a single password
+only grants or revokes the access of its recipient, while changes affecting
+many passwords rebuild the access rows of the affected key entries.
+
+Access gained or lost is recorded as a change, such that synchronizing users
+receive the key entry, or its tombstone.
+
+Note:
+    Group membership does not affect access by itself. A new member gains
+    access once passwords are encrypted for them.
+
+Note:
+    Bulk operations do not send signals, and must call
+    :code:`rebuild_access` themselves, once for all the key entries involved.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from api.models import Change
+from api.models import KeyEntryAccess
+from api.models import Password
+from api.models import PublicKey
+from api.models.changes import record_access_changes
+
+
+def grant_access(user_id, key_entry_id):
+    """Give the user access to the key entry, unless it already has."""
+    _, created = KeyEntryAccess.objects.get_or_create(
+        user_id=user_id, key_entry_id=key_entry_id
+    )
+    if created:
+        record_access_changes([(user_id, key_entry_id)], Change.UPSERT)
+
+
+def revoke_access(user_id, key_entry_id):
+    """Take away the access, unless the user still holds a password."""
+    if Password.objects.filter(
+            key_entry_id=key_entry_id, recipient_user_id=user_id
+    ).exists():
+        return
+    deleted_count, _ = KeyEntryAccess.objects.filter(
+        user_id=user_id, key_entry_id=key_entry_id
+    ).delete()
+    if deleted_count != 0:
+        record_access_changes([(user_id, key_entry_id)], Change.DELETE)
+
+
+def rebuild_access(key_entry_ids):
+    """Rebuild the access rows of the key entries in 'key_entry_ids'.
+
+    Only the rows which differ are deleted or inserted, such that rebuilding
+    up to date key entries does no writes.
+
+    Returns:
+        int: The number of access rows of the key entries.
+    """
+    key_entry_ids = list(key_entry_ids)
+    with transaction.atomic():
+        pairs = set(
+            Password.objects.filter(
+                key_entry_id__in=key_entry_ids
+            ).values_list('public_key__user_id', 'key_entry_id')
+        )
+        existing = dict(
+            ((user_id, key_entry_id), pk)
+            for pk, user_id, key_entry_id in KeyEntryAccess.objects.filter(
+                key_entry_id__in=key_entry_ids
+            ).values_list('pk', 'user_id', 'key_entry_id')
+        )
+        stale = [pair for pair in existing if pair not in pairs]
+        if stale:
+            KeyEntryAccess.objects.filter(
+                pk__in=[existing[pair] for pair in stale]
+            ).delete()
+            record_access_changes(stale, Change.DELETE)
+        missing = [pair for pair in pairs if pair not in existing]
+        KeyEntryAccess.objects.bulk_create([
+            KeyEntryAccess(user_id=user_id, key_entry_id=key_entry_id)
+            for user_id, key_entry_id in missing
+        ])
+        record_access_changes(missing, Change.UPSERT)
+    return len(pairs)
+
+
+@receiver(post_save, sender=Password)
+def password_saved(**kwargs):
+    """Grant the recipient access to the key entry of the password.
+
+    Passwords are rarely updated, but an update may change the recipient,
+    in which case the access to the key entry is rebuilt.
+    """
+    instance = kwargs['instance']
+    if kwargs['created']:
+        grant_access(instance.recipient_user_id, instance.key_entry_id)
+    else:
+        rebuild_access([instance.key_entry_id])
+
+
+@receiver(post_delete, sender=Password)
+def password_deleted(**kwargs):
+    """Revoke the recipients access, if it was their last password."""
+    instance = kwargs['instance']
+    revoke_access(instance.recipient_user_id, instance.key_entry_id)
+
+
+@receiver(post_save, sender=PublicKey)
+def public_key_changed(**kwargs):
+    """Rebuild the access to key entries holding passwords for the key.
+
+    Keys with passwords cannot be deleted, but may change owner, in which
+    case the recipient user of their passwords changes too. New keys have no
+    passwords, and saves keeping the owner leave the recipients as they are,
+    so neither writes anything.
+    """
+    instance = kwargs['instance']
+    if kwargs['created']:
+        return
+    moved = Password.objects.filter(public_key=instance).exclude(
+        recipient_user_id=instance.user_id
+    )
+    key_entry_ids = set(moved.values_list('key_entry_id', flat=True))
+    if not key_entry_ids:
+        return
+    moved.update(recipient_user_id=instance.user_id)
+    rebuild_access(key_entry_ids)
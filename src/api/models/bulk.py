@@ -0,0 +1,73 @@
+"""Bulk inserts of key entries and passwords.
+
+Bulk inserts send no signals, so these functions record the changes, bump
+the vault versions and rebuild the access rows, which the signal handlers
+would otherwise take care of.
+"""
+from django.db import connection
+
+from core import validation
+
+from api.models import Change
+from api.models import KeyEntry
+from api.models import Password
+from api.models import PublicKey
+from api.models.access import rebuild_access
+from api.models.vault import bump_vault_versions
+
+
+def insert_key_entries(key_entries):
+    """Insert the unsaved 'key_entries' as efficiently as the backend allows.
+
+    The passwords need the pks of the key entries, which only some backends
+    return from bulk inserts. Elsewhere the key entries are saved one by one,
+    letting the signal handlers record the changes.
+
+    The key entries must already be validated by the caller.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        KeyEntry.objects.bulk_create(key_entries)
+        # bulk_create sends no signals, the users gain access along with
+        # the passwords, see insert_passwords
+        Change.objects.bulk_create([
+            Change(
+                model=Change.KEY_ENTRY,
+                object_id=keyentry.pk,
+                action=Change.UPSERT,
+            )
+            for keyentry in key_entries
+        ])
+    else:
+        with validation.skipped(KeyEntry):
+            for keyentry in key_entries:
+                keyentry.save()
+
+
+def insert_passwords(passwords):
+    """Bulk insert the unsaved 'passwords' of newly inserted key entries.
+
+    The recipient users are looked up from the public keys, for passwords
+    which do not have them set already. The changes are covered by those of
+    the key entries, see :code:`api.models.changes`.
+    """
+    missing = [
+        password for password in passwords
+        if password.recipient_user_id is None
+    ]
+    if missing:
+        owners = dict(
+            PublicKey.objects.filter(
+                pk__in=set(password.public_key_id for password in missing)
+            ).values_list('pk', 'user_id')
+        )
+        for password in missing:
+            password.recipient_user_id = owners.get(password.public_key_id)
+
+    Password.objects.bulk_create(passwords)
+    rebuild_access(
+        set(password.key_entry_id for password in passwords)
+    )
+    # bulk_create sends no signals
+    bump_vault_versions(
+        set(password.recipient_user_id for password in passwords)
+    )
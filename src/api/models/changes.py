@@ -0,0 +1,202 @@
+"""Signal handlers recording key entry and password changes in :code:`Change`.
+
+Every change is recorded once for staff, and once for every user it
+concerns: the users with access to a changed key entry, and the recipient of
+a changed password. Gaining or losing access to a key entry is recorded as
+the key entry being created or deleted for the user, see
+:code:`api.models.access`.
+
+Note:
+    Bulk operations do not send signals, and must record their changes
+    themselves. Passwords bulk created along with a key entry are covered by
+    the key entry change, as synchronization sends key entries along with
+    their passwords.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db import transaction
+from django.db.models import F
+from django.db.models import Max
+from django.db.models import Min
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from api.models import Change
+from api.models import KeyEntry
+from api.models import KeyEntryAccess
+from api.models import Password
+from api.models import PublicKey
+
+
+SEQUENCE_LOCK_ID = 7264
+"""Key of the PostgreSQL advisory lock serializing :code:`sequence_changes`."""
+
+_SEQUENCE_LOCK = threading.Lock()
+
+
+@contextmanager
+def _sequence_lock():
+    """Hold the lock serializing sequencing, within a transaction."""
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_advisory_xact_lock(%s)', [SEQUENCE_LOCK_ID]
+                )
+            yield
+    else:
+        # Other backends serialize writers, and only run single processes
+        with _SEQUENCE_LOCK, transaction.atomic():
+            yield
+
+
+def sequence_changes():
+    """Assign sequence numbers to the committed changes lacking one.
+
+    Change ids are assigned on insert, but transactions commit in any order,
+    such that a change with a lower id may become visible after a client
+    synchronized past it. Sequence numbers are only assigned to committed
+    changes, one batch at a time under a lock, so every batch is numbered
+    above all those before it, keeping the id order within the batch.
+
+    Returns:
+        int: The latest sequence number, a safe synchronization token.
+    """
+    with _sequence_lock():
+        latest = Change.objects.aggregate(
+            latest=Max('sequence')
+        )['latest'] or 0
+        pending = Change.objects.filter(sequence__isnull=True).aggregate(
+            first=Min('pk'), last=Max('pk')
+        )
+        if pending['first'] is None:
+            return latest
+        offset = latest - pending['first'] + 1
+        # Changes committed meanwhile may fall outside the offset range,
+        # those are left for the next batch.
+        Change.objects.filter(
+            sequence__isnull=True,
+            pk__gte=pending['first'],
+            pk__lte=pending['last'],
+        ).update(sequence=F('pk') + offset)
+        return pending['last'] + offset
+
+
+def get_change_version():
+    """Get a version of the change log, without sequencing it.
+
+    The version consists of the latest sequence number, and the number of
+    committed changes still waiting for one. Every commit raises the latter,
+    until sequencing raises the former, such that the version changes with
+    every commit, including those of changes with lower ids.
+
+    Returns:
+        tuple: The latest sequence number, and the number of pending changes.
+    """
+    latest = Change.objects.aggregate(latest=Max('sequence'))['latest'] or 0
+    pending = Change.objects.filter(sequence__isnull=True).count()
+    return latest, pending
+
+
+def record_changes(model, object_id, action, user_ids):
+    """Record a change visible to staff, and to the users in 'user_ids'."""
+    Change.objects.bulk_create([
+        Change(
+            model=model,
+            object_id=object_id,
+            action=action,
+            user_id=user_id,
+        )
+        for user_id in [None] + list(user_ids)
+    ])
+
+
+def record_access_changes(pairs, action):
+    """Record key entries appearing to or disappearing from users.
+
+    Args:
+        pairs (iterable): :code:`(user_pk, key_entry_pk)` tuples.
+        action (str): :code:`Change.UPSERT` for access gained, or
+            :code:`Change.DELETE` for access lost.
+    """
+    Change.objects.bulk_create([
+        Change(
+            model=Change.KEY_ENTRY,
+            object_id=key_entry_id,
+            action=action,
+            user_id=user_id,
+        )
+        for user_id, key_entry_id in pairs
+    ])
+
+
+def _access_user_ids(key_entry_id):
+    return KeyEntryAccess.objects.filter(
+        key_entry_id=key_entry_id
+    ).values_list('user_id', flat=True)
+
+
+@receiver(post_save, sender=KeyEntry)
+def key_entry_saved(**kwargs):
+    """Record the change of a key entry, for the users with access."""
+    instance = kwargs['instance']
+    record_changes(
+        Change.KEY_ENTRY,
+        instance.pk,
+        Change.UPSERT,
+        _access_user_ids(instance.pk),
+    )
+
+
+@receiver(pre_delete, sender=KeyEntry)
+def key_entry_deleted(**kwargs):
+    """Record the deletion of a key entry, before its access is deleted."""
+    instance = kwargs['instance']
+    record_changes(
+        Change.KEY_ENTRY,
+        instance.pk,
+        Change.DELETE,
+        _access_user_ids(instance.pk),
+    )
+
+
+@receiver([post_save, post_delete], sender=Password)
+def password_changed(**kwargs):
+    """Record the change of a password, for its recipient."""
+    instance = kwargs['instance']
+    if kwargs['signal'] is post_delete:
+        action = Change.DELETE
+    else:
+        action = Change.UPSERT
+    record_changes(
+        Change.PASSWORD,
+        instance.pk,
+        action,
+        [instance.recipient_user_id],
+    )
+
+
+@receiver(post_save, sender=PublicKey)
+def public_key_changed(**kwargs):
+    """Record the passwords involving a key as changed, for staff.
+
+    Passwords render their keys, along with the key owners. The recipients
+    are covered by the access to their key entries, see
+    :code:`api.models.access`.
+    """
+    instance = kwargs['instance']
+    Change.objects.bulk_create([
+        Change(
+            model=Change.PASSWORD,
+            object_id=password_pk,
+            action=Change.UPSERT,
+        )
+        for password_pk in Password.objects.filter(
+            Q(public_key=instance) | Q(signing_key=instance)
+        ).values_list('pk', flat=True)
+    ])
@@ -0,0 +1,181 @@
+"""Newline-delimited JSON dumps of the vault.
+
+A dump holds one JSON object per line. Every key entry is followed by its
+passwords, such that a reader never needs to look back more than one entry:
+
+.. code:: json
+
+    {"type": "key_entry", "id": 1, "owner": 1, "title": "...", ...}
+    {"type": "password", "id": 1, "key_entry": 1, "public_key": 2, ...}
+    {"type": "password", "id": 2, "key_entry": 1, "public_key": 3, ...}
+
+Groups and public keys are referred to by pk, and ciphertexts and signatures
+are base64 encoded.
+
+The tables are walked in chunks of key entries by pk, using keyset
+pagination, and only one chunk is held in memory at a time. As such memory
+use is flat, no matter the size of the vault.
+
+Dumps can also be read as CSV, with a header row naming the columns of
+:code:`CSV_FIELDS`. Columns which do not apply to the row type are left
+empty.
+
+When loaded, key entries get new pks, while groups and public keys are
+referred to by their existing pks.
+"""
+from __future__ import unicode_literals
+
+import base64
+import csv
+import json
+from collections import OrderedDict
+
+from django.utils.encoding import smart_text
+
+from api.models import KeyEntry
+from api.models import Password
+from api.models import util
+
+
+KEY_ENTRY = 'key_entry'
+PASSWORD = 'password'
+
+KEY_ENTRY_FIELDS = ('id', 'owner', 'title', 'username', 'url', 'notes')
+PASSWORD_FIELDS = (
+    'id', 'key_entry', 'public_key', 'signing_key', 'password', 'signature'
+)
+BINARY_FIELDS = ('password', 'signature')
+INTEGER_FIELDS = ('id', 'owner', 'key_entry', 'public_key', 'signing_key')
+
+CSV_FIELDS = ('type',) + KEY_ENTRY_FIELDS + PASSWORD_FIELDS[1:]
+
+
+def _to_line(record_type, fields, row):
+    """Serialize a 'values_list' row of 'fields' as a line of JSON."""
+    record = OrderedDict([('type', record_type)])
+    for name, value in zip(fields, row):
+        if name in BINARY_FIELDS:
+            value = base64.b64encode(util.to_bytes(value)).decode('ascii')
+        record[name] = value
+    return json.dumps(record) + '\n'
+
+
+def iter_key_entry_chunks(queryset, chunk_size):
+    """Walk the key entries of 'queryset' by pk, 'chunk_size' at a time.
+
+    Yields:
+        list: :code:`KEY_ENTRY_FIELDS` rows, ordered by pk.
+    """
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                *KEY_ENTRY_FIELDS
+            )[:chunk_size]
+        )
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        yield rows
+
+
+def export_lines(queryset=None, chunk_size=1000):
+    """Generate the lines of a dump of the key entries in 'queryset'.
+
+    Args:
+        queryset: The key entries to dump, defaults to all of them.
+        chunk_size (int): Number of key entries to load per query.
+
+    Yields:
+        str: One JSON encoded key entry or password per line.
+    """
+    if queryset is None:
+        queryset = KeyEntry.objects.all()
+
+    for rows in iter_key_entry_chunks(queryset, chunk_size):
+        passwords = Password.objects.filter(
+            key_entry__in=[row[0] for row in rows]
+        ).order_by('key_entry', 'pk').values_list(*PASSWORD_FIELDS).iterator()
+
+        # Merge the passwords in, both are ordered by key entry
+        password = next(passwords, None)
+        for row in rows:
+            yield _to_line(KEY_ENTRY, KEY_ENTRY_FIELDS, row)
+            while password is not None and password[1] == row[0]:
+                yield _to_line(PASSWORD, PASSWORD_FIELDS, password)
+                password = next(passwords, None)
+
+
+def read_ndjson(stream):
+    """Read the records of the NDJSON dump 'stream', one at a time."""
+    for line in stream:
+        if line.strip():
+            yield json.loads(smart_text(line))
+
+
+def read_csv(stream):
+    """Read the records of the CSV dump 'stream', one at a time."""
+    for row in csv.DictReader(stream):
+        record = {}
+        for name, value in row.items():
+            value = smart_text(value)
+            if name in INTEGER_FIELDS:
+                value = int(value) if value else None
+            record[name] = value
+        yield record
+
+
+def group_entries(records):
+    """Group every key entry record with the password records following it.
+
+    Yields:
+        tuple: A key entry record, and the list of its password records.
+
+    Raises:
+        ValueError: If a record is of an unknown type, or a password does
+            not follow its key entry.
+    """
+    entry = None
+    passwords = []
+    for record in records:
+        record_type = record.get('type')
+        if record_type == KEY_ENTRY:
+            if entry is not None:
+                yield entry, passwords
+            entry = record
+            passwords = []
+        elif record_type == PASSWORD:
+            if entry is None or record['key_entry'] != entry['id']:
+                raise ValueError(
+                    "Password " + smart_text(record.get('id')) +
+                    " does not follow its key entry."
+                )
+            passwords.append(record)
+        else:
+            raise ValueError(
+                "Unknown record type: " + smart_text(record_type)
+            )
+    if entry is not None:
+        yield entry, passwords
+
+
+def build_key_entry(record):
+    """Build an unsaved key entry from the key entry 'record'."""
+    return KeyEntry(
+        owner_id=record['owner'],
+        title=record['title'],
+        username=record['username'],
+        url=record['url'],
+        notes=record['notes'],
+    )
+
+
+def build_password(record, key_entry):
+    """Build an unsaved password of 'key_entry' from the password 'record'."""
+    return Password(
+        key_entry=key_entry,
+        public_key_id=record['public_key'],
+        signing_key_id=record['signing_key'],
+        password=base64.b64decode(record['password']),
+        signature=base64.b64decode(record['signature']),
+    )
@@ -1,12 +1,13 @@
 # pylint: disable=W9903
 """Data generator."""
 import random
-import base64
 
 from django.utils.crypto import get_random_string
 
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric import rsa
 
 from api.models import KeyEntry
 from api.models import Password
@@ -45,19 +46,32 @@ def decrypt(private_key, ciphertext):
 
 
 def sign(private_key, message):
-    signature = private_key.sign(
-        message,
-        padding.PSS(
-            mgf=padding.MGF1(hashes.SHA256()),
-            salt_length=padding.PSS.MAX_LENGTH
-        ),
-        hashes.SHA256()
-    )
+    """Sign 'message' using the signature scheme for the key type.
+
+    Matches the schemes accepted by :code:`api.models.verify`.
+    """
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        signature = private_key.sign(
+            message,
+            padding.PSS(
+                mgf=padding.MGF1(hashes.SHA256()),
+                salt_length=padding.PSS.MAX_LENGTH
+            ),
+            hashes.SHA256()
+        )
+    elif isinstance(private_key, ec.EllipticCurvePrivateKey):
+        signature = private_key.sign(message, ec.ECDSA(hashes.SHA256()))
+    else:
+        # Ed25519 has a single fixed signature scheme
+        signature = private_key.sign(message)
     return signature
 
 
-def gen_key_entry(owner=None):
-    """Generate a randomized key_entry."""
+def gen_key_entry(owner=None, sign_key_type='rsa'):
+    """Generate a randomized key_entry.
+
+    The passwords are signed using a fresh key of 'sign_key_type'.
+    """
     if owner is None:
         owner = gen_group()
 
@@ -86,7 +100,7 @@ def gen_key_entry(owner=None):
         user__groups__key_entries=key_entry
     )
     # Prepare our keys
-    sign_private_key, sign_public_key = gen_key_pair()
+    sign_private_key, sign_public_key = gen_key_pair(sign_key_type)
     sign_public_key_object = gen_public_key(
         key=stringify_public_key(sign_public_key)
     )
@@ -95,13 +109,10 @@ def gen_key_entry(owner=None):
         # Encrypt and sign
         encrypted_password = encrypt(user_public_key.as_key(), raw_password)
         signature = sign(sign_private_key, encrypted_password)
-        # Base64 encode the binary
-        encoded_password = base64.b64encode(encrypted_password)
-        encoded_signature = base64.b64encode(signature)
 
         password = Password(
-            password=encoded_password,
-            signature=encoded_signature,
+            password=encrypted_password,
+            signature=signature,
             signing_key=sign_public_key_object,
             public_key=user_public_key,
             key_entry=key_entry
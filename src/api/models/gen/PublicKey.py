@@ -3,6 +3,8 @@
 import random
 
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric import ed25519
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 
@@ -12,12 +14,23 @@ from api.models.gen import util
 from api.models.gen import gen_user
 
 
-def gen_key_pair():
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-        backend=default_backend()
-    )
+def gen_key_pair(key_type='rsa'):
+    """Generate a key pair of 'key_type' ('rsa', 'ecdsa' or 'ed25519')."""
+    if key_type == 'rsa':
+        private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048,
+            backend=default_backend()
+        )
+    elif key_type == 'ecdsa':
+        private_key = ec.generate_private_key(
+            ec.SECP256R1(),
+            backend=default_backend()
+        )
+    elif key_type == 'ed25519':
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError('Unknown key type: ' + key_type)
     public_key = private_key.public_key()
     return private_key, public_key
 
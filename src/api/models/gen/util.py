@@ -5,6 +5,7 @@ import os
 import random
 from datetime import timedelta
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 
 
 def read(filename, strip=True):
@@ -21,29 +22,30 @@ RES_FOLDER = settings.BASE_DIR + "/api/models/gen/res/"
 
 # Files
 # -----
+# Read on first use, not whenever the generators are imported
 BIRDS_FILE = os.path.join(
     os.path.dirname(__file__),
     RES_FOLDER + 'danske_fugle'
 )
-BIRDS = read(BIRDS_FILE)
+BIRDS = SimpleLazyObject(lambda: read(BIRDS_FILE))
 
 FEMALE_FIRST_NAMES_FILE = os.path.join(
     os.path.dirname(__file__),
     RES_FOLDER + 'fornavne_piger'
 )
-FEMALE_FIRST_NAMES = read(FEMALE_FIRST_NAMES_FILE)
+FEMALE_FIRST_NAMES = SimpleLazyObject(lambda: read(FEMALE_FIRST_NAMES_FILE))
 
 MALE_FIRST_NAMES_FILE = os.path.join(
     os.path.dirname(__file__),
     RES_FOLDER + 'fornavne_drenge'
 )
-MALE_FIRST_NAMES = read(MALE_FIRST_NAMES_FILE)
+MALE_FIRST_NAMES = SimpleLazyObject(lambda: read(MALE_FIRST_NAMES_FILE))
 
 LAST_NAMES_FILE = os.path.join(
     os.path.dirname(__file__),
     RES_FOLDER + 'efternavne'
 )
-LAST_NAMES = read(LAST_NAMES_FILE)
+LAST_NAMES = SimpleLazyObject(lambda: read(LAST_NAMES_FILE))
 
 
 CHARACTERS = 'abcdefghijklmnopqrstuvwxyz'
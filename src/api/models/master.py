@@ -0,0 +1,79 @@
+"""Reconciliation of the master key user with :code:`MASTER_PUBLIC_KEY`.
+
+The master key user must hold exactly one public key, the one configured in
+:code:`settings.MASTER_PUBLIC_KEY`. Reconciliation is run after migrations,
+and by the :code:`reconcile_master_key` command, never on process startup.
+
+The current state is checked by fingerprint first, with a single read-only
+query, once every master key has a fingerprint. Only when the keys differ is the master key user locked, and the keys
+replaced, such that reconciling an up to date database does no writes.
+"""
+from django.db import transaction
+
+from api.models import PublicKey
+from api.models.util import fingerprint
+from api.models.util import get_lock
+from api.models.util import get_master_user
+from api.models.util import parse_key
+
+
+def master_key_current(master_fingerprint):
+    """Check whether the master key user holds only 'master_fingerprint'.
+
+    Keys stored before fingerprints were introduced are fingerprinted first,
+    such that the current master key is never mistaken for a spurious one.
+    """
+    fingerprints = []
+    for pk, key_fingerprint, key in PublicKey.objects.filter(
+            user__username='masterkey'
+    ).values_list('pk', 'fingerprint', 'key'):
+        if key_fingerprint is None:
+            key_fingerprint = backfill_fingerprint(pk, key)
+        fingerprints.append(key_fingerprint)
+    return fingerprints == [master_fingerprint]
+
+
+def backfill_fingerprint(pk, key):
+    """Store the missing fingerprint of the public key 'pk', with text 'key'.
+
+    Returns:
+        str: The fingerprint, or None if 'key' could not be parsed.
+    """
+    try:
+        key_fingerprint = fingerprint(key)
+    except ValueError:
+        return None
+    PublicKey.objects.filter(pk=pk).update(fingerprint=key_fingerprint)
+    return key_fingerprint
+
+
+def reconcile_master_key(master_key):
+    """Ensure the master key user holds exactly the public key 'master_key'.
+
+    Returns:
+        tuple: The number of spurious keys deleted, and whether the master
+            key was created.
+
+    Raises:
+        ValueError: If 'master_key' could not be parsed, or is not supported.
+    """
+    parse_key(master_key)
+    master_fingerprint = fingerprint(master_key)
+    if master_key_current(master_fingerprint):
+        return 0, False
+
+    with transaction.atomic():
+        user = get_master_user()
+        # Serialize concurrent reconciliations on the master key user
+        list(get_lock())
+        deleted_count, _ = PublicKey.objects.filter(
+            user=user
+        ).exclude(fingerprint=master_fingerprint).delete()
+        _, created = PublicKey.objects.get_or_create(
+            user=user,
+            fingerprint=master_fingerprint,
+            defaults={
+                'key': master_key
+            }
+        )
+    return deleted_count, created
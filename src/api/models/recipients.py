@@ -0,0 +1,153 @@
+"""Cached recipient sets for key entries.
+
+A key entry must carry one password for every public key of every member of
+its owner group. Computing that set means joining users, groups and public
+keys, so the set is cached per group, and invalidated by signals whenever the
+group membership or the members keys change.
+
+Note:
+    The cache lives in the :code:`RECIPIENT_CACHE` cache backend, which must
+    be shared between all worker processes (such as memcached), as
+    invalidations are only seen by the backend they are made in. A stale
+    recipient set would have clients encrypt for removed members. Process
+    local backends are therefore rejected by a system check, while the
+    dummy backend simply disables caching.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.encoding import smart_text
+
+from api.models import PublicKey
+
+
+ENCRYPTION_KEY_PREFIX = 'ssh-rsa '
+"""Passwords are encrypted using RSA-OAEP, so only RSA keys are recipients."""
+
+
+def _cache():
+    return caches[getattr(settings, 'RECIPIENT_CACHE', 'default')]
+
+
+@checks.register(checks.Tags.caches)
+def check_recipient_cache(**kwargs):
+    """Check that the recipient cache is shared between processes."""
+    if isinstance(_cache(), LocMemCache):
+        return [checks.Error(
+            "RECIPIENT_CACHE must be shared between worker processes.",
+            hint=(
+                "Point it at a shared cache backend, such as memcached, or "
+                "at the dummy backend to disable caching."
+            ),
+            obj='RECIPIENT_CACHE',
+            id='api.E001',
+        )]
+    return []
+
+
+def _bundle_cache_key(group_id):
+    return 'api:recipient-bundle:' + smart_text(group_id)
+
+
+def _recipient_keys(group_id):
+    """Query the recipient public keys of the group."""
+    return PublicKey.objects.filter(
+        user__groups__pk=group_id,
+        key__startswith=ENCRYPTION_KEY_PREFIX,
+    )
+
+
+def get_recipient_bundle(group_id):
+    """Get everything required to encrypt a password for the group.
+
+    The bundle is the single cached source of the recipients of a group, both
+    the recipients endpoint and the validation on create derive from it.
+
+    Returns:
+        tuple: An ETag, which only changes when the recipients or their keys
+            change, and a list of :code:`(user_pk, public_key_pk, key)`
+            tuples ordered by user and key.
+    """
+    cache = _cache()
+    key = _bundle_cache_key(group_id)
+    bundle = cache.get(key)
+    if bundle is None:
+        rows = list(
+            _recipient_keys(group_id).order_by('user_id', 'pk').values_list(
+                'user_id', 'pk', 'key'
+            )
+        )
+        digest = hashlib.sha256()
+        for row in rows:
+            digest.update(
+                ':'.join(smart_text(value) for value in row).encode('utf-8')
+            )
+            digest.update(b'\n')
+        bundle = (digest.hexdigest(), rows)
+        cache.set(
+            key,
+            bundle,
+            getattr(settings, 'RECIPIENT_CACHE_TIMEOUT', 300)
+        )
+    return bundle
+
+
+def get_recipients(group_id):
+    """Get the recipients required for key entries owned by the group.
+
+    Returns:
+        frozenset: :code:`(user_pk, public_key_pk)` tuples, one for every RSA
+            public key of every member of the group.
+    """
+    return frozenset(
+        (user_pk, public_key_pk)
+        for user_pk, public_key_pk, _ in get_recipient_bundle(group_id)[1]
+    )
+
+
+def invalidate_recipients(group_ids):
+    """Drop the cached recipient sets of the groups in 'group_ids'.
+
+    The sets are dropped once the transaction commits, as concurrent requests
+    could otherwise cache the old sets again, before the change is visible.
+    """
+    keys = [_bundle_cache_key(group_id) for group_id in group_ids]
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def _user_group_ids(user_id):
+    return list(
+        Group.objects.filter(user__pk=user_id).values_list('pk', flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def membership_changed(instance, action, **kwargs):
+    """Invalidate the groups whose membership changed."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if kwargs['reverse']:
+        # Changed through group.user_set, instance is the group
+        group_ids = [instance.pk]
+    elif action == 'pre_clear':
+        # Changed through user.groups.clear(), groups are not yet removed
+        group_ids = _user_group_ids(instance.pk)
+    else:
+        group_ids = kwargs['pk_set']
+    invalidate_recipients(group_ids)
+
+
+@receiver([post_save, post_delete], sender=PublicKey)
+def public_key_changed(**kwargs):
+    """Invalidate the groups of the user whose keys changed."""
+    invalidate_recipients(_user_group_ids(kwargs['instance'].user_id))
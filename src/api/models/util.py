@@ -1,14 +1,114 @@
+import base64
+import binascii
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils import six
 
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
+from core.util import LRUCache
 
 MAX_LENGTH_NUMBER=2000
 
+PARSED_KEY_CACHE = LRUCache(
+    getattr(settings, 'PUBLIC_KEY_CACHE_SIZE', 1024)
+)
+"""Process-wide cache of parsed public keys, keyed by :code:`key_digest`."""
+
+
+def key_digest(key):
+    """Return the SHA256 digest of the OpenSSH key text 'key'."""
+    if isinstance(key, six.text_type):
+        key = key.encode('utf-8')
+    return hashlib.sha256(key).digest()
+
+
+def fingerprint(key):
+    """Return the SHA256 fingerprint of the OpenSSH key text 'key'.
+
+    The fingerprint is the hex encoded SHA256 digest of the binary key blob,
+    as such it is unaffected by the key comment, and is URL safe.
+
+    Raises:
+        ValueError: If the key is not on the OpenSSH format.
+    """
+    parts = key.split()
+    if len(parts) < 2:
+        raise ValueError("Key is not in the proper format.")
+    try:
+        blob = base64.b64decode(parts[1])
+    except (TypeError, binascii.Error):
+        raise ValueError("Key is not in the proper format.")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def to_bytes(value):
+    """Convert a :code:`BinaryField` value to a byte string.
+
+    Depending on the database backend, binary values are loaded as byte
+    strings, buffers or memoryviews.
+    """
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    if isinstance(value, six.text_type):
+        return value.encode('ascii')
+    return six.binary_type(value)
+
+
+def check_key_type(public_key):
+    """Check that 'public_key' is of a type we can verify signatures with.
+
+    Supported key types are RSA, ECDSA on the P-256 curve and Ed25519.
+
+    Raises:
+        ValueError: If the key type is not supported.
+    """
+    # Imported on first use, to keep the backends out of process startup
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        return
+    if (isinstance(public_key, ec.EllipticCurvePublicKey) and
+            isinstance(public_key.curve, ec.SECP256R1)):
+        return
+    raise ValueError(
+        "Unsupported key type, use RSA, ECDSA (nistp256) or Ed25519."
+    )
+
+
+def _load_key(key):
+    """Parse and type check 'key', see :code:`parse_key`."""
+    from cryptography.exceptions import UnsupportedAlgorithm
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+
+    try:
+        public_key = serialization.load_ssh_public_key(
+            key,
+            backend=default_backend()
+        )
+    except UnsupportedAlgorithm as error:
+        raise ValueError(str(error))
+    check_key_type(public_key)
+    return public_key
+
+
 def parse_key(key):
-    return serialization.load_ssh_public_key(
-        key,
-        backend=default_backend()
+    """Parse the OpenSSH public key 'key' into a key object.
+
+    Parsed keys are cached in :code:`PARSED_KEY_CACHE`, as the same handful of
+    keys are parsed over and over again when validating passwords.
+
+    Raises:
+        ValueError: If the key could not be parsed, or is not supported.
+    """
+    return PARSED_KEY_CACHE.get_or_compute(
+        key_digest(key),
+        lambda: _load_key(key)
     )
 
 
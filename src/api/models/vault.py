@@ -0,0 +1,58 @@
+"""Signal handlers keeping :code:`VaultVersion` up to date.
+
+Any change to a key entry, password or public key bumps the vault version of
+every user who can see it. Staff users can see everything, so rather than
+bumping every staff user on every change, their vaults are versioned by the
+change log, see :code:`api.views.conditional`.
+
+Note:
+    Bulk operations do not send signals, and must call
+    :code:`bump_vault_versions` themselves.
+"""
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from api.models import KeyEntry
+from api.models import Password
+from api.models import PublicKey
+from api.models import VaultVersion
+
+
+def bump_vault_versions(user_ids):
+    """Bump the vault version of the users in 'user_ids'."""
+    VaultVersion.bump(user_ids)
+
+
+@receiver([post_save, post_delete], sender=KeyEntry)
+def key_entry_changed(**kwargs):
+    """Bump the users holding a password for the key entry."""
+    bump_vault_versions(
+        PublicKey.objects.filter(
+            passwords__key_entry=kwargs['instance']
+        ).values_list('user_id', flat=True)
+    )
+
+
+@receiver([post_save, post_delete], sender=Password)
+def password_changed(**kwargs):
+    """Bump the user the password is encrypted for."""
+    bump_vault_versions(
+        PublicKey.objects.filter(
+            pk=kwargs['instance'].public_key_id
+        ).values_list('user_id', flat=True)
+    )
+
+
+@receiver([post_save, post_delete], sender=PublicKey)
+def public_key_changed(**kwargs):
+    """Bump the key owner and users holding passwords involving the key."""
+    instance = kwargs['instance']
+    user_ids = set(
+        Password.objects.filter(
+            Q(public_key=instance) | Q(signing_key=instance)
+        ).values_list('public_key__user_id', flat=True)
+    )
+    user_ids.add(instance.user_id)
+    bump_vault_versions(user_ids)
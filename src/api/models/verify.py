@@ -0,0 +1,237 @@
+"""Signature verification of encrypted passwords.
+
+Verifying a single signature is cheap enough, but a key entry is created with
+one signed password for every recipient, so large groups mean hundreds of
+checks per request. :code:`verify_signatures` spreads such batches over a pool
+of worker processes, while small batches are verified inline.
+
+With :code:`SIGNATURE_VERIFY_WORKERS` above one, every process starts its own
+pool on the first batch large enough to use it, such that pools are never
+inherited from a parent, as with preforking web servers loading the
+application before forking. Web servers already run a worker process per
+core, so by default there is no pool, and batches are verified inline.
+
+Successful verifications are remembered in :code:`VERIFIED_CACHE`, such that
+the same password is not verified again, when it is cleaned on save.
+"""
+import hashlib
+import os
+import struct
+
+from django.conf import settings
+from django.utils import six
+from django.utils.translation import ugettext_lazy as _lazy
+
+from core.util import LRUCache
+
+from api.models import util
+
+
+INVALID_KEY = 'invalid_key'
+INVALID_SIGNATURE = 'invalid_signature'
+
+ERROR_MESSAGES = {
+    INVALID_KEY: _lazy("Signing key could not be parsed."),
+    INVALID_SIGNATURE: _lazy("Signature does not match the password."),
+}
+"""Human readable messages for the error codes returned by verification."""
+
+
+VERIFIED_CACHE = LRUCache(
+    getattr(settings, 'SIGNATURE_CACHE_SIZE', 65536)
+)
+"""Process-wide set of verified signatures, keyed by :code:`item_digest`."""
+
+
+def item_digest(key, password, signature):
+    """Return a digest identifying a (key, password, signature) triple."""
+    digest = hashlib.sha256()
+    for part in (key, password, signature):
+        if isinstance(part, six.text_type):
+            part = part.encode('utf-8')
+        else:
+            part = util.to_bytes(part)
+        # Length prefix each part, as binary parts may contain anything
+        digest.update(struct.pack('>I', len(part)))
+        digest.update(part)
+    return digest.digest()
+
+
+def _check_signature(key, password, signature):
+    """Uncached signature check, see :code:`verify_signature`."""
+    # Imported on first use, to keep the backends out of process startup
+    from cryptography.exceptions import InvalidSignature
+
+    try:
+        public_key = util.parse_key(key)
+    except ValueError:
+        return INVALID_KEY
+
+    try:
+        _verify_by_key_type(
+            public_key,
+            util.to_bytes(signature),
+            util.to_bytes(password)
+        )
+    except InvalidSignature:
+        return INVALID_SIGNATURE
+    return None
+
+
+def _verify_by_key_type(public_key, signature, data):
+    """Verify using the signature scheme matching the type of 'public_key'.
+
+    * RSA keys sign using RSA-PSS with SHA256.
+    * ECDSA keys (P-256) sign using ECDSA with SHA256.
+    * Ed25519 keys sign using Ed25519.
+
+    Raises:
+        InvalidSignature: If the signature does not check out.
+    """
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    if isinstance(public_key, rsa.RSAPublicKey):
+        public_key.verify(
+            signature,
+            data,
+            padding.PSS(
+                mgf=padding.MGF1(hashes.SHA256()),
+                salt_length=padding.PSS.MAX_LENGTH
+            ),
+            hashes.SHA256()
+        )
+    elif (isinstance(public_key, ec.EllipticCurvePublicKey) and
+          isinstance(public_key.curve, ec.SECP256R1)):
+        # Only P-256, as accepted by util.check_key_type
+        public_key.verify(signature, data, ec.ECDSA(hashes.SHA256()))
+    elif isinstance(public_key, ed25519.Ed25519PublicKey):
+        public_key.verify(signature, data)
+    else:
+        raise InvalidSignature()
+
+
+def verify_signature(key, password, signature):
+    """Verify that 'signature' is a signature of 'password' made by 'key'.
+
+    Args:
+        key (str): OpenSSH public key text of the signer.
+        password (bytes): The encrypted password.
+        signature (bytes): The signature of the password.
+
+    Returns:
+        str: :code:`None` if the signature checks out, otherwise one of the
+            error codes in :code:`ERROR_MESSAGES`.
+    """
+    digest = item_digest(key, password, signature)
+    if VERIFIED_CACHE.get(digest) is not None:
+        return None
+    error = _check_signature(key, password, signature)
+    if error is None:
+        VERIFIED_CACHE.put(digest, True)
+    return error
+
+
+def _verify_item(item):
+    """Unpack an item for :code:`_check_signature`, used by the pool."""
+    return _check_signature(*item)
+
+
+_POOL = None
+_POOL_WORKERS = 0
+_POOL_PID = None
+"""Id of the process that started :code:`_POOL`, the only one it works in."""
+
+
+def get_worker_count():
+    """Return the number of processes to verify signatures with.
+
+    A single worker means verifying inline, without a pool.
+    """
+    return getattr(settings, 'SIGNATURE_VERIFY_WORKERS', 1)
+
+
+def start_pool(workers=None):
+    """Start the verification pool of this process, if it is configured.
+
+    A pool inherited from a parent process is dropped, as its workers belong
+    to the parent; see :code:`verify_signatures` for starting on first use.
+
+    Args:
+        workers (int): Number of processes, defaults to
+            :code:`SIGNATURE_VERIFY_WORKERS`.
+    """
+    global _POOL, _POOL_WORKERS, _POOL_PID
+    if _POOL is not None and _POOL_PID != os.getpid():
+        _POOL = None
+        _POOL_WORKERS = 0
+    if workers is None:
+        workers = get_worker_count()
+    if _POOL is not None or workers <= 1:
+        return
+    # Imported here, to keep it out of process startup when not used
+    import multiprocessing
+    # Daemonic processes (such as parallel test runners) cannot fork a pool
+    if multiprocessing.current_process().daemon:
+        return
+    _POOL = multiprocessing.Pool(processes=workers)
+    _POOL_WORKERS = workers
+    _POOL_PID = os.getpid()
+
+
+def stop_pool():
+    """Stop the process-wide verification pool, if it was started."""
+    global _POOL, _POOL_WORKERS, _POOL_PID
+    if _POOL is None:
+        return
+    if _POOL_PID == os.getpid():
+        _POOL.terminate()
+        _POOL.join()
+    _POOL = None
+    _POOL_WORKERS = 0
+    _POOL_PID = None
+
+
+def verify_signatures(items):
+    """Verify a batch of signatures.
+
+    Batches of at least :code:`SIGNATURE_VERIFY_MIN_BATCH` items are verified
+    in parallel, if a pool is configured, starting it on first use; smaller
+    batches are verified inline.
+
+    Args:
+        items (iterable): :code:`(key, password, signature)` tuples, as taken
+            by :code:`verify_signature`.
+
+    Returns:
+        list: The result of :code:`verify_signature` for every item, in the
+            same order as the items.
+    """
+    items = list(items)
+    digests = [item_digest(*item) for item in items]
+    results = [None] * len(items)
+    # Only items not already known to be valid need to be checked
+    pending = [
+        index for index, digest in enumerate(digests)
+        if VERIFIED_CACHE.get(digest) is None
+    ]
+    pending_items = [items[index] for index in pending]
+
+    min_batch = getattr(settings, 'SIGNATURE_VERIFY_MIN_BATCH', 32)
+    if len(pending) >= min_batch:
+        start_pool()
+    if _POOL is None or len(pending) < min_batch:
+        errors = [_verify_item(item) for item in pending_items]
+    else:
+        chunksize = max(1, len(pending) // (_POOL_WORKERS * 4))
+        errors = _POOL.map(_verify_item, pending_items, chunksize)
+
+    for index, error in zip(pending, errors):
+        results[index] = error
+        if error is None:
+            VERIFIED_CACHE.put(digests[index], True)
+    return results
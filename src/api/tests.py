@@ -1,6 +1,1343 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import base64
+import json
+import tempfile
+
+import mock
+import msgpack
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import IntegrityError
+from django.db import connection
+from django.db import transaction
 from django.test import TestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import six
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+from rest_framework.test import APITransactionTestCase
+
+from core import validation
+from core.util import LRUCache
+
+from api.models import Change
+from api.models import KeyEntry
+from api.models import KeyEntryAccess
+from api.models import Password
+from api.models import PublicKey
+from api.models import VaultVersion
+from api.models import util
+from api.models import verify
+from api.models.access import rebuild_access
+from api.models.bulk import insert_passwords
+from api.models.changes import sequence_changes
+from api.models.gen import gen_group
+from api.models.gen import gen_key_pair
+from api.models.gen import gen_key_entry
+from api.models.gen import gen_public_key
+from api.models.gen import gen_user
+from api.models.gen import stringify_public_key
+from api.models.gen.KeyEntry import encrypt
+from api.models.gen.KeyEntry import sign
+from api.models.master import reconcile_master_key
+from api.models.recipients import check_recipient_cache
+from api.models.recipients import get_recipients
+from api.views.KeyEntry import KeyEntrySerializer
+from api.views.PublicKey import PublicKeySerializer
+from api.views.fields import Base64Field
+
+
+class GroupTestMixin(object):
+    """Setup for tests acting as a member of a group of recipients."""
+
+    def setUp(self):
+        self.group = gen_group()
+        self.user = self.add_member()
+        self.client.force_authenticate(self.user)
+
+    def add_member(self):
+        """Add a new user with an RSA public key to the group."""
+        user = gen_user()
+        gen_public_key(user=user)
+        self.group.user_set.add(user)
+        return user
+
+
+class GroupTestCase(GroupTestMixin, APITestCase):
+    """Base for tests acting as a member of a group of recipients."""
+
+
+class GroupTransactionTestCase(GroupTestMixin, APITransactionTestCase):
+    """Base for group tests relying on commits, such as on_commit hooks."""
+
+
+class KeyEntryQueryCountTest(GroupTestCase):
+    """Listing key entries must use a constant number of queries."""
+
+    MAX_QUERIES = 5
+    """Vault version, key entries and passwords, plus transaction overhead."""
+
+    def setUp(self):
+        super(KeyEntryQueryCountTest, self).setUp()
+        # Created on first read, which should not count towards the queries
+        VaultVersion.get_for_user(self.user.pk)
+
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_list_query_count(self):
+        gen_key_entry(owner=self.group)
+        baseline = self.count_queries('/api/keyentry/')
+        self.assertLessEqual(baseline, self.MAX_QUERIES)
+
+        for _ in range(3):
+            self.add_member()
+        for _ in range(3):
+            gen_key_entry(owner=self.group)
+        self.assertEqual(self.count_queries('/api/keyentry/'), baseline)
+
+    def test_retrieve_query_count(self):
+        key_entry = gen_key_entry(owner=self.group)
+        path = '/api/keyentry/' + str(key_entry.pk) + '/'
+        baseline = self.count_queries(path)
+        self.assertLessEqual(baseline, self.MAX_QUERIES)
+
+        for _ in range(3):
+            self.add_member()
+        key_entry = gen_key_entry(owner=self.group)
+        path = '/api/keyentry/' + str(key_entry.pk) + '/'
+        self.assertEqual(self.count_queries(path), baseline)
+
+
+class SparseFieldsTest(GroupTestCase):
+    """?fields= and ?expand= must trim the representation and its queries."""
+
+    def setUp(self):
+        super(SparseFieldsTest, self).setUp()
+        VaultVersion.get_for_user(self.user.pk)
+        gen_key_entry(owner=self.group)
+
+    def get_entry(self, query=''):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/keyentry/' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0], len(context.captured_queries)
+
+    def test_fields(self):
+        entry, query_count = self.get_entry('?fields=title,url')
+        self.assertEqual(set(entry.keys()), {'title', 'url'})
+        # The passwords are not prefetched
+        self.assertLess(query_count, self.get_entry()[1])
+
+    def test_nested_fields(self):
+        entry, _ = self.get_entry('?fields=title,passwords.password')
+        self.assertNotEqual(entry['passwords'], [])
+        self.assertEqual(set(entry.keys()), {'title', 'passwords'})
+        for password in entry['passwords']:
+            self.assertEqual(set(password.keys()), {'password'})
+
+    def test_expand_default(self):
+        entry, _ = self.get_entry()
+        self.assertNotEqual(entry['passwords'], [])
+        for password in entry['passwords']:
+            self.assertIsInstance(password['public_key'], dict)
+
+    def test_expand_collapsed(self):
+        entry, _ = self.get_entry('?expand=')
+        self.assertNotEqual(entry['passwords'], [])
+        for password in entry['passwords']:
+            self.assertIsInstance(password, six.string_types)
+
+    def test_expand_nested(self):
+        entry, _ = self.get_entry('?expand=passwords')
+        self.assertNotEqual(entry['passwords'], [])
+        for password in entry['passwords']:
+            self.assertIsInstance(password, dict)
+            self.assertIsInstance(password['public_key'], six.string_types)
+
+
+class OwnPasswordsTest(GroupTestCase):
+    """?passwords=own must only return the callers own ciphertexts."""
+
+    def setUp(self):
+        super(OwnPasswordsTest, self).setUp()
+        for _ in range(2):
+            self.add_member()
+
+    def test_list_own_passwords(self):
+        key_entry = gen_key_entry(owner=self.group)
+        # Not a recipient of this one
+        gen_key_entry(owner=gen_group())
+
+        response = self.client.get('/api/keyentry/?passwords=own')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['title'], key_entry.title)
+        own = Password.objects.get(
+            key_entry=key_entry, public_key__user=self.user
+        )
+        self.assertEqual(
+            [password['url'] for password in results[0]['passwords']],
+            ['http://testserver/api/password/' + str(own.pk) + '/']
+        )
+
+    def test_staff_own_passwords(self):
+        self.user.is_staff = True
+        self.user.save()
+        gen_key_entry(owner=gen_group())
+
+        response = self.client.get('/api/keyentry/?passwords=own')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+
+class NormalizedListTest(GroupTestCase):
+    """?normalize=true must include every public key and user once."""
+
+    def setUp(self):
+        super(NormalizedListTest, self).setUp()
+        for _ in range(2):
+            self.add_member()
+        for _ in range(2):
+            gen_key_entry(owner=self.group)
+
+    def test_list_normalized(self):
+        nested = self.client.get('/api/keyentry/')
+        response = self.client.get('/api/keyentry/?normalize=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(response.content), len(nested.content))
+
+        included = response.data['included']
+        for key_entry in response.data['results']:
+            for password in key_entry['passwords']:
+                for name in ('public_key', 'signing_key'):
+                    public_key = included['public_keys'][str(password[name])]
+                    self.assertIn(str(public_key['user']), included['users'])
+
+    def test_retrieve_not_normalized(self):
+        password = self.client.get('/api/password/').data['results'][0]
+        response = self.client.get(password['url'] + '?normalize=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('included', response.data)
+        self.assertIsInstance(response.data['public_key'], dict)
+
+
+class SignedEntryTestCase(GroupTestCase):
+    """Base for tests creating key entries, signed by the user."""
+
+    def setUp(self):
+        super(SignedEntryTestCase, self).setUp()
+        for _ in range(2):
+            self.add_member()
+        self.private_key, public_key = gen_key_pair()
+        self.signing_key = gen_public_key(
+            user=self.user, key=stringify_public_key(public_key)
+        )
+
+    def gen_entry(self, valid=True):
+        passwords = []
+        public_keys = PublicKey.objects.filter(user__groups=self.group)
+        for public_key in public_keys:
+            password = encrypt(public_key.as_key(), b'secret')
+            signature = sign(self.private_key, password)
+            if not valid:
+                signature = sign(self.private_key, b'something else')
+            passwords.append({
+                'user_pk': public_key.user_id,
+                'public_key': public_key.pk,
+                'password': base64.b64encode(password),
+                'signature': base64.b64encode(signature),
+            })
+        return {
+            'owner': 'http://testserver/api/group/' + str(self.group.pk) + '/',
+            'title': 'title',
+            'username': 'username',
+            'url': 'url',
+            'notes': '',
+            'passwords_write': passwords,
+            'signing_key': self.signing_key.pk,
+        }
+
+
+class CreateTest(SignedEntryTestCase):
+    """Creating a key entry must insert its passwords in bulk."""
+
+    def post(self, entry):
+        return self.client.post('/api/keyentry/', entry, format='json')
+
+    def count_queries(self):
+        entry = self.gen_entry()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.post(entry).status_code, 201)
+        return len(queries)
+
+    def test_create(self):
+        response = self.post(self.gen_entry())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['passwords']), 4)
+        self.assertEqual(
+            set(Password.objects.values_list('recipient_user', flat=True)),
+            set(self.group.user_set.values_list('pk', flat=True))
+        )
+
+    def test_create_query_count(self):
+        query_count = self.count_queries()
+        for _ in range(5):
+            self.add_member()
+        self.assertEqual(self.count_queries(), query_count)
+
+    def test_invalid_signature(self):
+        response = self.post(self.gen_entry(valid=False))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(KeyEntry.objects.count(), 0)
+        self.assertEqual(Password.objects.count(), 0)
+
+
+class BulkImportTest(SignedEntryTestCase):
+    """Bulk imports must create valid entries, and report failing ones."""
+
+    def post(self, entries, atomic=False):
+        return self.client.post(
+            '/api/keyentry/bulk/',
+            {'entries': entries, 'atomic': atomic},
+            format='json'
+        )
+
+    def test_bulk_import(self):
+        response = self.post([self.gen_entry() for _ in range(3)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 3)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(KeyEntry.objects.count(), 3)
+        self.assertEqual(Password.objects.count(), 3 * 4)
+
+    def test_partial_failure(self):
+        entries = [self.gen_entry(), self.gen_entry(valid=False)]
+        response = self.post(entries)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [item['index'] for item in response.data['created']], [0]
+        )
+        self.assertEqual(
+            [item['index'] for item in response.data['errors']], [1]
+        )
+        self.assertEqual(KeyEntry.objects.count(), 1)
+
+    def test_msgpack_import(self):
+        entry = self.gen_entry()
+        for password in entry['passwords_write']:
+            password['password'] = base64.b64decode(password['password'])
+            password['signature'] = base64.b64decode(password['signature'])
+        response = self.client.post(
+            '/api/keyentry/bulk/',
+            msgpack.packb({'entries': [entry]}, use_bin_type=True),
+            content_type='application/msgpack'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(KeyEntry.objects.count(), 1)
+
+    def test_atomic_failure(self):
+        entries = [self.gen_entry(), self.gen_entry(valid=False)]
+        response = self.post(entries, atomic=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], [])
+        self.assertEqual(KeyEntry.objects.count(), 0)
+
+    def test_resolved_once(self):
+        with mock.patch(
+                'api.views.KeyEntry.get_recipients', wraps=get_recipients
+        ) as recipients, mock.patch.object(
+            KeyEntrySerializer, 'get_signing_key', autospec=True,
+            side_effect=KeyEntrySerializer.get_signing_key
+        ) as signing_key:
+            response = self.post([self.gen_entry() for _ in range(3)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(recipients.call_count, 1)
+        self.assertEqual(signing_key.call_count, 1)
+
+    def post_failing_insert(self, atomic):
+        """Post three entries, where inserting the passwords of one fails."""
+        def insert(passwords):
+            titles = set(password.key_entry.title for password in passwords)
+            if 'conflict' in titles:
+                raise IntegrityError()
+            return insert_passwords(passwords)
+        entries = [self.gen_entry() for _ in range(3)]
+        entries[1]['title'] = 'conflict'
+        with mock.patch(
+                'api.views.KeyEntry.insert_passwords', side_effect=insert
+        ):
+            return self.post(entries, atomic=atomic)
+
+    def test_partial_insert_failure(self):
+        response = self.post_failing_insert(atomic=False)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [item['index'] for item in response.data['created']], [0, 2]
+        )
+        self.assertEqual(
+            [item['index'] for item in response.data['errors']], [1]
+        )
+        self.assertEqual(KeyEntry.objects.count(), 2)
+        self.assertEqual(Password.objects.count(), 2 * 4)
+
+    def test_atomic_insert_failure(self):
+        response = self.post_failing_insert(atomic=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], [])
+        self.assertEqual(KeyEntry.objects.count(), 0)
+
+
+class ExportTest(GroupTestCase):
+    """The export must contain every key entry, followed by its passwords."""
+
+    def setUp(self):
+        super(ExportTest, self).setUp()
+        self.add_member()
+
+    def test_export(self):
+        key_entries = [gen_key_entry(owner=self.group) for _ in range(3)]
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.client.get('/api/export/')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).splitlines()
+        records = [json.loads(line.decode('utf-8')) for line in lines]
+        self.assertEqual(len(records), Password.objects.count() + 3)
+
+        self.assertEqual(
+            [record['id'] for record in records
+             if record['type'] == 'key_entry'],
+            [key_entry.pk for key_entry in key_entries]
+        )
+        key_entry = None
+        for record in records:
+            if record['type'] == 'key_entry':
+                key_entry = record['id']
+            else:
+                self.assertEqual(record['key_entry'], key_entry)
+                password = Password.objects.get(pk=record['id'])
+                self.assertEqual(
+                    base64.b64decode(record['password']),
+                    bytes(password.password)
+                )
+
+    def test_export_staff_only(self):
+        response = self.client.get('/api/export/')
+        self.assertEqual(response.status_code, 403)
+
+
+class ImportTest(GroupTestCase):
+    """Importing an export must recreate it, and be resumable."""
+
+    def setUp(self):
+        super(ImportTest, self).setUp()
+        self.add_member()
+        for _ in range(3):
+            gen_key_entry(owner=self.group)
+        self.dump = tempfile.NamedTemporaryFile(suffix='.ndjson')
+        call_command('export_vault', output=self.dump.name)
+
+    def tearDown(self):
+        self.dump.close()
+
+    def call_import(self, **options):
+        call_command(
+            'import_vault', self.dump.name, stdout=six.StringIO(), **options
+        )
+
+    def test_import(self):
+        passwords = Password.objects.count()
+        self.call_import(batch_size=1)
+        self.assertEqual(KeyEntry.objects.count(), 6)
+        self.assertEqual(Password.objects.count(), 2 * passwords)
+
+    def test_resume(self):
+        # Skip the first key entry and its passwords
+        offset = 1 + Password.objects.filter(
+            key_entry=KeyEntry.objects.order_by('pk').first()
+        ).count()
+        self.call_import(offset=offset)
+        self.assertEqual(KeyEntry.objects.count(), 5)
+
+
+class MessagePackTest(GroupTestCase):
+    """MessagePack responses must carry the JSON content, with raw bytes."""
+
+    def setUp(self):
+        super(MessagePackTest, self).setUp()
+        gen_key_entry(owner=self.group)
+
+    def test_list_msgpack(self):
+        response = self.client.get(
+            '/api/keyentry/', HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content, raw=False)
+        password = data['results'][0]['passwords'][0]
+
+        expected = self.client.get('/api/keyentry/').data
+        expected_password = expected['results'][0]['passwords'][0]
+        self.assertEqual(
+            password['password'],
+            base64.b64decode(expected_password['password'])
+        )
+        self.assertEqual(password['url'], expected_password['url'])
+        self.assertLess(
+            len(response.content), len(self.client.get('/api/keyentry/').content)
+        )
+
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipients': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+"""Caches for testing, as recipient caching is disabled by default.
+
+Invalidation happens on commit, so tests using them must commit.
+"""
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class RecipientsTest(GroupTransactionTestCase):
+    """The recipients of a group must match those required on create."""
+
+    def setUp(self):
+        caches['recipients'].clear()
+        super(RecipientsTest, self).setUp()
+        self.path = '/api/group/' + str(self.group.pk) + '/recipients/'
+
+    def get_recipients(self):
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_recipients(self):
+        response = self.get_recipients()
+        self.assertEqual(
+            set(
+                (recipient['user_pk'], recipient['public_key'])
+                for recipient in response.data['recipients']
+            ),
+            get_recipients(self.group.pk)
+        )
+
+    def test_recipients_etag(self):
+        etag = self.get_recipients()['ETag']
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept', self.get_recipients()['Vary'])
+
+    def assertETagChanged(self, change):
+        etag = self.get_recipients()['ETag']
+        change()
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(
+                (recipient['user_pk'], recipient['public_key'])
+                for recipient in response.data['recipients']
+            ),
+            get_recipients(self.group.pk)
+        )
+
+    def test_etag_member_added(self):
+        self.assertETagChanged(self.add_member)
+
+    def test_etag_member_removed(self):
+        member = self.add_member()
+        self.assertETagChanged(lambda: self.group.user_set.remove(member))
+
+    def test_etag_key_added(self):
+        self.assertETagChanged(lambda: gen_public_key(user=self.user))
+
+    def test_etag_format(self):
+        etag = self.get_recipients()['ETag']
+        response = self.client.get(
+            self.path,
+            HTTP_ACCEPT='application/msgpack',
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class RecipientCacheTest(GroupTransactionTestCase):
+    """Cached recipients must be invalidated by membership and key changes."""
+
+    def setUp(self):
+        caches['recipients'].clear()
+        super(RecipientCacheTest, self).setUp()
+        get_recipients(self.group.pk)
+
+    def assertCurrent(self):
+        self.assertEqual(
+            get_recipients(self.group.pk),
+            frozenset(
+                PublicKey.objects.filter(
+                    user__groups=self.group
+                ).values_list('user_id', 'pk')
+            )
+        )
+
+    def test_cached(self):
+        # Updates bypassing signals are not seen until invalidated
+        PublicKey.objects.filter(user=self.user).update(key='ecdsa-sha2')
+        self.assertEqual(len(get_recipients(self.group.pk)), 1)
+
+    def test_member_added(self):
+        self.add_member()
+        self.assertCurrent()
+
+    def test_member_removed(self):
+        self.group.user_set.remove(self.user)
+        self.assertCurrent()
+
+    def test_groups_cleared(self):
+        self.user.groups.clear()
+        self.assertCurrent()
+
+    def test_key_created(self):
+        gen_public_key(user=self.user)
+        self.assertCurrent()
+
+    def test_key_deleted(self):
+        PublicKey.objects.get(user=self.user).delete()
+        self.assertCurrent()
+
+    def test_invalidated_on_commit(self):
+        with transaction.atomic():
+            self.group.user_set.remove(self.user)
+            # Cached by a concurrent request, which does not see the removal
+            caches['recipients'].set(
+                'api:recipient-bundle:' + str(self.group.pk),
+                ('stale', [(self.user.pk, 0, '')])
+            )
+        self.assertCurrent()
+
+    def test_check_rejects_local_cache(self):
+        self.assertEqual(
+            [error.id for error in check_recipient_cache()], ['api.E001']
+        )
+        dummy = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        with override_settings(CACHES={'recipients': dummy}):
+            self.assertEqual(check_recipient_cache(), [])
+
+
+class AccessTest(GroupTestCase):
+    """Key entries must be listed once, for users with several keys."""
+
+    def setUp(self):
+        super(AccessTest, self).setUp()
+        gen_public_key(user=self.user)
+
+    def list_key_entries(self):
+        response = self.client.get('/api/keyentry/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_no_duplicates(self):
+        gen_key_entry(owner=self.group)
+        self.assertEqual(len(self.list_key_entries()), 1)
+
+    def test_rebuild_access(self):
+        gen_key_entry(owner=self.group)
+        KeyEntryAccess.objects.all().delete()
+        self.assertEqual(self.list_key_entries(), [])
+
+        call_command('rebuild_access', stdout=six.StringIO())
+        self.assertEqual(len(self.list_key_entries()), 1)
+
+    def add_password(self, key_entry, user):
+        """Save a copy of a password of 'key_entry', for a key of 'user'."""
+        copied = Password.objects.filter(key_entry=key_entry).first()
+        password = Password(
+            key_entry=key_entry,
+            public_key=gen_public_key(user=user),
+            password=copied.password,
+            signature=copied.signature,
+            signing_key=copied.signing_key,
+        )
+        with validation.skipped(Password):
+            with CaptureQueriesContext(connection) as context:
+                password.save()
+        return len(context.captured_queries)
+
+    def has_access(self, user, key_entry):
+        return KeyEntryAccess.objects.filter(
+            user=user, key_entry=key_entry
+        ).exists()
+
+    def test_grant_query_count(self):
+        key_entry = gen_key_entry(owner=self.group)
+        query_count = self.add_password(key_entry, gen_user())
+
+        for _ in range(5):
+            self.add_member()
+        key_entry = gen_key_entry(owner=self.group)
+        access = list(KeyEntryAccess.objects.filter(key_entry=key_entry))
+        user = gen_user()
+        self.assertEqual(self.add_password(key_entry, user), query_count)
+        self.assertTrue(self.has_access(user, key_entry))
+        # The existing rows are left alone
+        self.assertTrue(
+            set(access) < set(KeyEntryAccess.objects.filter(
+                key_entry=key_entry
+            ))
+        )
+
+    def test_revoke(self):
+        key_entry = gen_key_entry(owner=self.group)
+        first, second = Password.objects.filter(
+            key_entry=key_entry, recipient_user=self.user
+        )
+        first.delete()
+        self.assertTrue(self.has_access(self.user, key_entry))
+        second.delete()
+        self.assertFalse(self.has_access(self.user, key_entry))
+
+    def test_rebuild_current(self):
+        key_entry = gen_key_entry(owner=self.group)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(rebuild_access([key_entry.pk]), 1)
+        self.assertFalse(any(
+            query['sql'].startswith(('INSERT', 'DELETE'))
+            for query in context.captured_queries
+        ))
+
+
+class VaultVersionTest(GroupTestCase):
+    """List ETags must change whenever the users vault changes."""
+
+    def get(self, etag=None, query='', **headers):
+        if etag is not None:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        return self.client.get('/api/keyentry/' + query, **headers)
+
+    def assertNoWrites(self, etag=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.get(etag)
+        self.assertFalse(any(
+            query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            for query in context.captured_queries
+        ))
+        return response
+
+    def assertChanged(self, etag):
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(etag).status_code, 304)
+
+    def test_representation(self):
+        etag = self.get()['ETag']
+        for query in ('?fields=title', '?expand=', '?passwords=own',
+                      '?normalize=true', '?page_size=1'):
+            self.assertEqual(self.get(etag, query).status_code, 200)
+        response = self.get(etag, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.get(response['ETag'], HTTP_ACCEPT='application/msgpack')
+            .status_code,
+            304
+        )
+
+    def test_read_only(self):
+        VaultVersion.objects.filter(user=self.user).delete()
+        etag = self.assertNoWrites()['ETag']
+        self.assertEqual(self.assertNoWrites(etag).status_code, 304)
+        self.assertFalse(VaultVersion.objects.filter(user=self.user).exists())
+
+        gen_key_entry(owner=self.group)
+        self.assertChanged(etag)
+
+    def test_key_entry_created(self):
+        etag = self.get()['ETag']
+        gen_key_entry(owner=self.group)
+        self.assertChanged(etag)
+
+    def test_staff(self):
+        self.user.is_staff = True
+        self.user.save()
+        etag = self.assertNoWrites()['ETag']
+        self.assertEqual(self.assertNoWrites(etag).status_code, 304)
+        version = VaultVersion.get_for_user(self.user.pk).version
+
+        # Key entries are visible to staff, without holding a password
+        gen_key_entry(owner=gen_group())
+        etag = self.assertChanged(etag)
+        self.assertEqual(self.assertNoWrites(etag).status_code, 304)
+
+        # Sequencing the changes, as sync does, is a change of version too
+        sequence_changes()
+        etag = self.assertChanged(etag)
+        self.assertEqual(self.get(etag).status_code, 304)
+        # Staff are versioned by the changes, instead of bumped
+        self.assertEqual(
+            VaultVersion.get_for_user(self.user.pk).version, version
+        )
+
+    def test_staff_promoted(self):
+        etag = self.get()['ETag']
+        self.user.is_staff = True
+        self.user.save()
+        etag = self.assertChanged(etag)
+
+        self.user.is_staff = False
+        self.user.save()
+        self.assertChanged(etag)
+
+    def test_bump_missing(self):
+        VaultVersion.objects.filter(user=self.user).delete()
+        VaultVersion.bump([self.user.pk])
+        self.assertEqual(VaultVersion.get_for_user(self.user.pk).version, 1)
+
+
+class SyncTest(GroupTestCase):
+    """Sync must deliver exactly the changes visible to the user."""
+
+    def setUp(self):
+        super(SyncTest, self).setUp()
+        self.token = self.get_token(self.user)
+
+    def get(self, user, query=''):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/sync/' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_token(self, user):
+        return self.get(user)['token']
+
+    def sync(self, user, token):
+        return self.get(user, '?since=' + token)
+
+    def delete(self, key_entry):
+        key_entry.passwords.all().delete()
+        key_entry.delete()
+
+    def test_visibility(self):
+        outsider = gen_user()
+        gen_public_key(user=outsider)
+        token = self.get_token(outsider)
+
+        key_entry = gen_key_entry(owner=self.group)
+        data = self.sync(self.user, self.token)
+        self.assertEqual(len(data['key_entries']), 1)
+        self.assertEqual(len(data['passwords']), 1)
+
+        self.delete(key_entry)
+        data = self.sync(outsider, token)
+        self.assertEqual(data['key_entries'], [])
+        self.assertEqual(data['passwords'], [])
+        self.assertEqual(
+            data['deleted'], {'key_entries': [], 'passwords': []}
+        )
+
+    def test_deleted(self):
+        key_entry_pk = gen_key_entry(owner=self.group).pk
+        token = self.sync(self.user, self.token)['token']
+        self.delete(KeyEntry.objects.get(pk=key_entry_pk))
+        data = self.sync(self.user, token)
+        self.assertEqual(data['deleted']['key_entries'], [key_entry_pk])
+        self.assertEqual(data['key_entries'], [])
+
+    def test_access_lost(self):
+        key_entry = gen_key_entry(owner=self.group)
+        token = self.sync(self.user, self.token)['token']
+        password = Password.objects.get(recipient_user=self.user)
+        password_pk = password.pk
+        password.delete()
+        data = self.sync(self.user, token)
+        self.assertEqual(data['deleted'], {
+            'key_entries': [key_entry.pk],
+            'passwords': [password_pk],
+        })
+
+    def test_staff(self):
+        staff = gen_user()
+        staff.is_staff = True
+        staff.save()
+        token = self.get_token(staff)
+        gen_key_entry(owner=gen_group())
+        self.assertEqual(len(self.sync(staff, token)['key_entries']), 1)
+        self.assertEqual(
+            self.sync(self.user, self.token)['key_entries'], []
+        )
+
+    def test_commit_order(self):
+        def record(object_id):
+            return Change.objects.create(
+                model=Change.KEY_ENTRY,
+                object_id=object_id,
+                action=Change.DELETE,
+                user=self.user,
+            )
+        pending = record(1)
+        record(2)
+        # Not committed yet, when the later change is synchronized
+        pending.delete()
+        data = self.sync(self.user, self.token)
+        self.assertEqual(data['deleted']['key_entries'], [2])
+
+        # Committed with the lower id, after the token was handed out
+        pending.save()
+        data = self.sync(self.user, data['token'])
+        self.assertEqual(data['deleted']['key_entries'], [1])
+
+
+class RecipientUserTest(GroupTestCase):
+    """Passwords must know their recipient user, once backfilled."""
+
+    def setUp(self):
+        super(RecipientUserTest, self).setUp()
+        gen_key_entry(owner=self.group)
+
+    def test_set_on_save(self):
+        for password in Password.objects.select_related('public_key'):
+            self.assertEqual(
+                password.recipient_user_id, password.public_key.user_id
+            )
+
+    def test_public_key_changed(self):
+        password = Password.objects.get()
+        user = self.add_member()
+        password.public_key = PublicKey.objects.get(user=user)
+        with validation.skipped(Password):
+            password.save()
+        self.assertEqual(password.recipient_user_id, user.pk)
+        self.assertEqual(
+            set(KeyEntryAccess.objects.values_list('user_id', flat=True)),
+            {user.pk}
+        )
+
+    def test_key_owner_changed(self):
+        public_key = Password.objects.get().public_key
+        user = gen_user()
+        public_key.user = user
+        public_key.save()
+        self.assertEqual(Password.objects.get().recipient_user_id, user.pk)
+        self.assertEqual(
+            list(KeyEntryAccess.objects.values_list('user_id', flat=True)),
+            [user.pk]
+        )
+
+    def test_key_owner_kept(self):
+        public_key = Password.objects.get().public_key
+        with CaptureQueriesContext(connection) as context:
+            public_key.save()
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(('UPDATE "api_password"',
+                                        'INSERT INTO "api_keyentryaccess"',
+                                        'DELETE'))
+        ]
+        self.assertEqual(writes, [])
+
+    def test_backfill(self):
+        Password.objects.update(recipient_user=None)
+        self.assertEqual(self.client.get('/api/password/').data['results'], [])
+
+        call_command('backfill_recipient_users', stdout=six.StringIO())
+        self.assertEqual(
+            len(self.client.get('/api/password/').data['results']), 1
+        )
+
+
+class MasterKeyTest(TestCase):
+    """The master key user must hold exactly the configured master key."""
+
+    def master_fingerprints(self):
+        return list(PublicKey.objects.filter(
+            user__username='masterkey'
+        ).values_list('fingerprint', flat=True))
+
+    def test_reconciled_after_migrate(self):
+        self.assertEqual(len(self.master_fingerprints()), 1)
+
+    def test_current_does_no_writes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                reconcile_master_key(settings.MASTER_PUBLIC_KEY), (0, False)
+            )
+
+    def test_replaces_spurious_keys(self):
+        master_fingerprint = self.master_fingerprints()[0]
+        PublicKey.objects.filter(user__username='masterkey').delete()
+        gen_public_key(
+            user=get_user_model().objects.get(username='masterkey')
+        )
+
+        call_command('reconcile_master_key', stdout=six.StringIO())
+        self.assertEqual(self.master_fingerprints(), [master_fingerprint])
+
+    def test_missing_fingerprint(self):
+        # As left by the migration adding the column, on existing keys
+        master_keys = PublicKey.objects.filter(user__username='masterkey')
+        master_key_pk = master_keys.get().pk
+        master_keys.update(fingerprint=None)
+
+        self.assertEqual(
+            reconcile_master_key(settings.MASTER_PUBLIC_KEY), (0, False)
+        )
+        self.assertEqual(master_keys.get().pk, master_key_pk)
+        self.assertEqual(
+            self.master_fingerprints(),
+            [util.fingerprint(settings.MASTER_PUBLIC_KEY)]
+        )
+
+
+class VerifyTest(TestCase):
+    """Batches of signatures must be verified, inline or by the pool."""
+
+    def setUp(self):
+        verify.VERIFIED_CACHE.clear()
+        private_key, public_key = gen_key_pair()
+        self.key = stringify_public_key(public_key)
+        self.items = []
+        for index in range(4):
+            password = six.text_type(index).encode('ascii')
+            self.items.append((self.key, password, sign(private_key, password)))
+        # Signed by the key, but not this password
+        self.items.append((self.key, b'forged', self.items[0][2]))
+        self.items.append(('not a key', b'password', self.items[0][2]))
+
+    def assert_results(self):
+        self.assertEqual(
+            verify.verify_signatures(self.items),
+            [None] * 4 + [verify.INVALID_SIGNATURE, verify.INVALID_KEY]
+        )
+
+    def test_inline(self):
+        self.assert_results()
+
+    @override_settings(SIGNATURE_VERIFY_MIN_BATCH=2)
+    def test_pool(self):
+        verify.start_pool(workers=2)
+        try:
+            self.assertIsNotNone(verify._POOL)
+            self.assert_results()
+        finally:
+            verify.stop_pool()
+
+    @override_settings(SIGNATURE_VERIFY_MIN_BATCH=2, SIGNATURE_VERIFY_WORKERS=2)
+    def test_pool_started_on_use(self):
+        try:
+            self.assertIsNone(verify._POOL)
+            self.assert_results()
+            self.assertIsNotNone(verify._POOL)
+        finally:
+            verify.stop_pool()
+
+    @override_settings(SIGNATURE_VERIFY_MIN_BATCH=2, SIGNATURE_VERIFY_WORKERS=2)
+    def test_inherited_pool(self):
+        verify.start_pool()
+        inherited = verify._POOL
+        # As seen by a process forked after the pool was started
+        with mock.patch.object(verify.os, 'getpid', return_value=-1):
+            try:
+                self.assert_results()
+                self.assertIsNot(verify._POOL, inherited)
+            finally:
+                verify.stop_pool()
+        inherited.terminate()
+        inherited.join()
+
+
+class ParseKeyCacheTest(TestCase):
+    """Parsed keys must be served from the bounded LRU cache."""
+
+    def setUp(self):
+        self.keys = [
+            stringify_public_key(gen_key_pair()[1]) for _ in range(3)
+        ]
+
+    @mock.patch.object(util, 'PARSED_KEY_CACHE', LRUCache(2))
+    def test_hit_and_eviction(self):
+        first = util.parse_key(self.keys[0])
+        self.assertIs(util.parse_key(self.keys[0]), first)
+        self.assertEqual(util.PARSED_KEY_CACHE.stats()['hits'], 1)
+
+        util.parse_key(self.keys[1])
+        # Touch the first key, such that the second is the oldest
+        util.parse_key(self.keys[0])
+        util.parse_key(self.keys[2])
+        stats = util.PARSED_KEY_CACHE.stats()
+        self.assertEqual((stats['evictions'], stats['size']), (1, 2))
+        self.assertIn(util.key_digest(self.keys[0]), util.PARSED_KEY_CACHE)
+        self.assertNotIn(util.key_digest(self.keys[1]), util.PARSED_KEY_CACHE)
+
+    @mock.patch.object(util, 'PARSED_KEY_CACHE', LRUCache(2))
+    def test_invalid_not_cached(self):
+        with self.assertRaises(ValueError):
+            util.parse_key('ssh-rsa invalid')
+        self.assertEqual(len(util.PARSED_KEY_CACHE), 0)
+
+
+class SignatureCacheTest(TestCase):
+    """Successful verifications must be remembered, failures must not."""
+
+    def setUp(self):
+        verify.VERIFIED_CACHE.clear()
+        private_key, public_key = gen_key_pair()
+        self.key = stringify_public_key(public_key)
+        self.signature = sign(private_key, b'password')
+
+    def verify_twice(self, password):
+        with mock.patch.object(
+                verify, '_check_signature',
+                wraps=verify._check_signature) as check:
+            results = [
+                verify.verify_signature(self.key, password, self.signature)
+                for _ in range(2)
+            ]
+        return results, check.call_count
+
+    def test_hit(self):
+        self.assertEqual(self.verify_twice(b'password'), ([None, None], 1))
+        self.assertEqual(len(verify.VERIFIED_CACHE), 1)
+
+    def test_failure_not_cached(self):
+        results, calls = self.verify_twice(b'forged')
+        self.assertEqual(results, [verify.INVALID_SIGNATURE] * 2)
+        self.assertEqual(calls, 2)
+        self.assertEqual(len(verify.VERIFIED_CACHE), 0)
+
+    def test_batch_fills_cache(self):
+        verify.verify_signatures([(self.key, b'password', self.signature)])
+        self.assertIsNotNone(verify.VERIFIED_CACHE.get(
+            verify.item_digest(self.key, b'password', self.signature)
+        ))
+
+
+class Base64FieldTest(TestCase):
+    """Binary values must round-trip through their base64 representation."""
+
+    def test_round_trip(self):
+        field = Base64Field()
+        value = b'\x00\xffraw ciphertext'
+        text = field.to_representation(memoryview(value))
+        self.assertEqual(text, base64.b64encode(value).decode('ascii'))
+        self.assertEqual(field.run_validation(text), value)
+
+    def test_invalid(self):
+        field = Base64Field()
+        for data in ('abc', 42):
+            with self.assertRaises(ValidationError):
+                field.run_validation(data)
+
+
+class ConvertPasswordsTest(GroupTestCase):
+    """Base64 encoded password rows must be converted to raw binary once."""
+
+    def convert(self):
+        out = six.StringIO()
+        call_command('convert_passwords', stdout=out)
+        return out.getvalue().strip()
+
+    def test_convert(self):
+        gen_key_entry(owner=self.group)
+        raw = dict(
+            (pk, (bytes(password), bytes(signature)))
+            for pk, password, signature in Password.objects.values_list(
+                'pk', 'password', 'signature'
+            )
+        )
+        for pk, (password, signature) in raw.items():
+            Password.objects.filter(pk=pk).update(
+                password=base64.b64encode(password),
+                signature=base64.b64encode(signature)
+            )
+
+        self.assertEqual(self.convert(), 'Converted 1 of 1 passwords')
+        for password in Password.objects.all():
+            self.assertEqual(
+                (bytes(password.password), bytes(password.signature)),
+                raw[password.pk]
+            )
+        # Already binary rows are left untouched
+        self.assertEqual(self.convert(), 'Converted 0 of 1 passwords')
+
+
+class KeyTypeTest(TestCase):
+    """Ed25519 and ECDSA P-256 signatures must verify, like RSA ones."""
+
+    def setUp(self):
+        verify.VERIFIED_CACHE.clear()
+
+    def check_key_type(self, key_type):
+        private_key, public_key = gen_key_pair(key_type)
+        key = stringify_public_key(public_key)
+        signature = sign(private_key, b'password')
+        self.assertIsNone(
+            verify.verify_signature(key, b'password', signature)
+        )
+        self.assertEqual(
+            verify.verify_signature(key, b'forged', signature),
+            verify.INVALID_SIGNATURE
+        )
+
+    def test_ed25519(self):
+        self.check_key_type('ed25519')
+
+    def test_ecdsa(self):
+        self.check_key_type('ecdsa')
+
+    def test_other_curves_rejected(self):
+        private_key = ec.generate_private_key(
+            ec.SECP384R1(), backend=default_backend()
+        )
+        public_key = private_key.public_key()
+        with self.assertRaises(ValueError):
+            util.parse_key(stringify_public_key(public_key))
+        with self.assertRaises(InvalidSignature):
+            verify._verify_by_key_type(
+                public_key, sign(private_key, b'password'), b'password'
+            )
+
+
+class PublicKeyLookupTest(GroupTestCase):
+    """Fingerprint lookups must be revalidated, per representation."""
+
+    def setUp(self):
+        super(PublicKeyLookupTest, self).setUp()
+        self.public_key = self.user.public_keys.get()
+        self.path = (
+            '/api/public_key/by-fingerprint/' +
+            self.public_key.fingerprint + '/'
+        )
+
+    def test_lookup(self):
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['key'], self.public_key.key)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept', response['Vary'])
+
+        response = self.client.get(
+            self.path, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_per_representation(self):
+        etags = set([
+            self.client.get(self.path)['ETag'],
+            self.client.get(self.path + '?fields=key')['ETag'],
+            self.client.get(
+                self.path, HTTP_ACCEPT='application/msgpack'
+            )['ETag'],
+        ])
+        self.assertEqual(len(etags), 3)
+
+    def test_etag_per_registration(self):
+        etag = self.client.get(self.path)['ETag']
+        key = self.public_key.key
+        self.public_key.delete()
+        gen_public_key(user=gen_user(), key=key)
+        self.assertNotEqual(self.client.get(self.path)['ETag'], etag)
+
+    def test_duplicate(self):
+        response = self.client.post(
+            '/api/public_key/', {'key': self.public_key.key}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_race(self):
+        # As if registered between the validation and the insert
+        with mock.patch.object(
+                PublicKeySerializer, 'validate_key',
+                lambda serializer, value: value), \
+                validation.skipped(PublicKey):
+            response = self.client.post(
+                '/api/public_key/', {'key': self.public_key.key},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('key', response.data)
+
+    def test_invalid_unvalidated(self):
+        with validation.skipped(PublicKey):
+            with self.assertRaises(ValueError):
+                PublicKey.objects.create(user=self.user, key='not a key')
+        self.assertFalse(
+            PublicKey.objects.filter(fingerprint__isnull=True).exists()
+        )
+
+
+class KeysetPaginationTest(GroupTestCase):
+    """Cursors must walk the rows in pk order, unaffected by changes."""
+
+    def setUp(self):
+        super(KeysetPaginationTest, self).setUp()
+        for _ in range(4):
+            gen_public_key(user=self.user)
+
+    def get_page(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def pks(self, page):
+        return [
+            PublicKey.objects.get(fingerprint=item['fingerprint']).pk
+            for item in page['results']
+        ]
+
+    def test_walk(self):
+        pks = []
+        page = self.get_page('/api/public_key/?page_size=2')
+        self.assertNotIn('count', page)
+        while True:
+            pks.extend(self.pks(page))
+            if page['next'] is None:
+                break
+            page = self.get_page(page['next'])
+        self.assertEqual(
+            pks, list(PublicKey.objects.order_by('pk').values_list(
+                'pk', flat=True
+            ))
+        )
+
+    def test_stable_cursor(self):
+        page = self.get_page('/api/public_key/?page_size=2')
+        first = self.pks(page)
+        # Changes before the cursor must not shift the next page
+        PublicKey.objects.filter(pk=first[0]).delete()
+        gen_public_key(user=self.user)
+
+        following = self.pks(self.get_page(page['next']))
+        self.assertEqual(
+            following,
+            list(PublicKey.objects.filter(pk__gt=first[-1]).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:2])
+        )
 
-# Create your tests here.
+    def test_count(self):
+        page = self.get_page('/api/public_key/?page_size=2&count=true')
+        self.assertEqual(page['count'], PublicKey.objects.count())
@@ -16,8 +16,17 @@ router.register(r'keyentry',
                 views.KeyEntryViewSet,)
 router.register(r'public_key',
                 views.PublicKeyViewSet,)
+router.register(r'sync',
+                views.SyncViewSet,
+                base_name='sync')
+router.register(r'export',
+                views.ExportViewSet,
+                base_name='export')
 
 urlpatterns = [
+    url(r'^public_key/by-fingerprint/(?P<fingerprint>[0-9a-f]{64})/$',
+        views.PublicKeyViewSet.as_view({'get': 'by_fingerprint'}),
+        name='publickey-by-fingerprint'),
     url(r'^', include(router.urls)),
     url(r'^auth/', include('rest_framework.urls', namespace='rest_framework')),
 ]
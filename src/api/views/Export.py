@@ -0,0 +1,36 @@
+"""API endpoint for exporting the vault."""
+# pylint: disable=W9903
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from rest_framework import permissions
+from rest_framework import viewsets
+
+from api.models import dump
+
+
+class ExportViewSet(viewsets.ViewSet):
+    """Download every key entry and password as newline-delimited JSON.
+
+    Intended for backups and migrations, hence only available to staff. See
+    :code:`api.models.dump` for the format.
+
+    The response is streamed while the tables are walked in chunks, such that
+    memory use stays flat regardless of the vault size.
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def list(self, request):
+        lines = dump.export_lines(
+            chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 1000)
+        )
+        response = StreamingHttpResponse(
+            lines, content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="vault.ndjson"'
+        )
+        return response
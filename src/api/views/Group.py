@@ -1,14 +1,28 @@
 """API endpoint for Group."""
 from __future__ import unicode_literals
 
+import hashlib
+from collections import OrderedDict
+
 from django.contrib.auth.models import Group
+from django.utils.cache import patch_cache_control
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 
 from rest_framework import serializers
 from rest_framework import viewsets
+from rest_framework.decorators import detail_route
+from rest_framework.response import Response
+
+from api.models.recipients import get_recipient_bundle
+
+from api.views.sparse import SparseFieldsMixin
 
 
 # Serializers define the API representation.
-class GroupSerializer(serializers.HyperlinkedModelSerializer):
+class GroupSerializer(SparseFieldsMixin,
+                       serializers.HyperlinkedModelSerializer):
     """Serializer to present groups."""
 
     class Meta:
@@ -16,7 +30,41 @@ class GroupSerializer(serializers.HyperlinkedModelSerializer):
         fields = '__all__'
 
 
+def recipients_etag(request, pk=None):
+    """ETag function for :code:`condition`, specific to the format."""
+    return get_recipient_bundle(pk)[0] + '-' + hashlib.sha256(
+        getattr(request, 'accepted_media_type', '').encode('utf-8')
+    ).hexdigest()[:8]
+
+
 # ViewSets define the view behavior.
 class GroupViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
+
+    @detail_route()
+    @method_decorator(condition(etag_func=recipients_etag))
+    def recipients(self, request, pk=None):
+        """Get the recipients of key entries owned by the group.
+
+        The response lists exactly the :code:`(user_pk, public_key)` pairs,
+        which a new key entry must carry a password for, along with the keys
+        to encrypt with. The ETag only changes when the group membership or
+        the members keys change, such that clients can revalidate cheaply.
+        """
+        group = self.get_object()
+        etag, rows = get_recipient_bundle(group.pk)
+        response = Response(OrderedDict([
+            ('group', group.pk),
+            ('recipients', [
+                OrderedDict([
+                    ('user_pk', user_pk),
+                    ('public_key', public_key_pk),
+                    ('key', key),
+                ])
+                for user_pk, public_key_pk, key in rows
+            ]),
+        ]))
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept',))
+        return response
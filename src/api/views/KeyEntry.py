@@ -3,114 +3,343 @@
 # TODO: Do translations wherever required.
 from __future__ import unicode_literals
 
+from collections import OrderedDict
+
+from django.conf import settings
 from django.forms import widgets
+from django.db.models import Prefetch
 from django.db.models import Q
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext as _
+from django.utils.encoding import smart_text
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.db import transaction
 
 from rest_framework import serializers
 from rest_framework import viewsets
 from rest_framework import mixins
+from rest_framework import status
+from rest_framework.decorators import list_route
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
 
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
 
 from api.models import KeyEntry
+from api.models import KeyEntryAccess
 from api.models import Password
+from api.models.bulk import insert_key_entries
+from api.models.bulk import insert_passwords
+from api.models.recipients import get_recipients
+from api.models.verify import verify_signatures
 from api.views.Password import PasswordSerializer
+from api.views.Password import PasswordViewSet
+from api.views.fields import Base64Field
+from api.views.conditional import VaultVersionMixin
+from api.views.normalize import NormalizedListMixin
+from api.views.pagination import KeysetPagination
+from api.views.sparse import SparseFieldsMixin
+from api.views.sparse import child_expand_spec
+from api.views.sparse import child_fields_spec
+from api.views.sparse import field_expanded
+from api.views.sparse import field_requested
+from api.views.sparse import get_request_specs
+
+
+def visible_key_entries(user):
+    """Get the key entries visible to 'user'."""
+    # If staff, show everything
+    if user.is_staff:
+        return KeyEntry.objects.all()
+    # If user, only show our own passwords
+    return recipient_key_entries(user)
+
+
+def recipient_key_entries(user):
+    """Get the key entries holding a password encrypted for 'user'.
+
+    Unlike :code:`visible_key_entries` this also applies to staff. It is a
+    semi-join on the materialized :code:`KeyEntryAccess` table, such that
+    users with several keys do not get duplicate rows.
+    """
+    return KeyEntry.objects.filter(
+        pk__in=KeyEntryAccess.objects.filter(
+            user_id=user.pk
+        ).values('key_entry')
+    )
+
+
+def prefetch_passwords(queryset, fields_spec=None, expand_spec=None,
+                       recipient=None, normalize=False):
+    """Prefetch everything the nested serializers touch on 'queryset'.
+
+    This keeps the number of queries constant, regardless of the number of
+    recipients of each key entry. Only what is requested according to the
+    :code:`?fields=` and :code:`?expand=` specs is fetched.
+
+    Args:
+        recipient: If given, only the passwords encrypted for this user are
+            prefetched, instead of one for every member of the owner group.
+        normalize: Whether the keys of the passwords are referred to by pk.
+    """
+    if not field_requested(fields_spec, 'passwords'):
+        return queryset
+
+    passwords = Password.objects.order_by('pk')
+    if recipient is not None:
+        passwords = passwords.filter(recipient_user_id=recipient.pk)
+    if not field_expanded(expand_spec, 'passwords'):
+        # Only the hyperlinks are rendered
+        passwords = passwords.only('pk', 'key_entry')
+    else:
+        passwords = PasswordViewSet.optimize_queryset(
+            passwords,
+            child_fields_spec(fields_spec, 'passwords'),
+            child_expand_spec(expand_spec, 'passwords'),
+            normalize
+        )
+    return queryset.prefetch_related(Prefetch('passwords', queryset=passwords))
+
+
+def failed_user_pks(passwords, results):
+    """Get the user pks of 'passwords' whose signature check failed.
+
+    Args:
+        passwords (list): Validated :code:`PasswordWriteSerializer` data.
+        results (list): The result of :code:`verify_signatures` for each.
+    """
+    return [
+        dicty['user_pk']
+        for dicty, error in zip(passwords, results) if error is not None
+    ]
+
+
+def invalid_signatures_message(failed):
+    """Error message for the passwords of users 'failed'."""
+    return _(
+        "Request contained invalid signatures. " +
+        "Invalid passwords: " + smart_text(failed)
+    )
+
+
+def create_key_entries(validated_entries):
+    """Create key entries along with their passwords, in one transaction.
+
+    Args:
+        validated_entries (list): Validated :code:`KeyEntrySerializer` data,
+            with the signatures already verified.
+
+    Returns:
+        list: The created key entries, in the same order.
+    """
+    key_entries = []
+    password_objects = []
+    with transaction.atomic(savepoint=True):
+        entries = []
+        for validated_data in validated_entries:
+            validated_data = dict(validated_data)
+            passwords = validated_data.pop('passwords_write')
+            validated_data.pop('user', None)
+            # Resolved by validate
+            signing_key = validated_data.pop('signing_key')
+            entries.append(
+                (KeyEntry(**validated_data), passwords, signing_key)
+            )
+        key_entries = [keyentry for keyentry, _, _ in entries]
+        insert_key_entries(key_entries)
+
+        for keyentry, passwords, signing_key in entries:
+            for dicty in passwords:
+                password_objects.append(Password(
+                    key_entry=keyentry,
+                    public_key_id=dicty['public_key'],
+                    # Validated against the recipients by validate
+                    recipient_user_id=dicty['user_pk'],
+                    password=dicty['password'],
+                    signature=dicty['signature'],
+                    signing_key=signing_key
+                ))
+        # Validate each row once, bulk_create skips the pre_save hook.
+        # The foreign keys and uniqueness are already guaranteed by the
+        # recipient check in validate, and signatures are cached.
+        for password in password_objects:
+            password.clean_fields(
+                exclude=[
+                    'key_entry', 'public_key', 'signing_key', 'recipient_user'
+                ]
+            )
+            password.clean()
+        insert_passwords(password_objects)
+    return key_entries
+
+
+class PasswordWriteSerializer(serializers.Serializer):
+    """Serializer for the passwords uploaded along with a key entry."""
+
+    user_pk = serializers.IntegerField()
+    public_key = serializers.IntegerField()
+    password = Base64Field()
+    signature = Base64Field()
 
 
 # Serializers define the API representation.
-class KeyEntrySerializer(serializers.HyperlinkedModelSerializer):
+class KeyEntrySerializer(SparseFieldsMixin,
+                          serializers.HyperlinkedModelSerializer):
     """Serializer to present users (get_user_model())."""
 
     class Meta:
         model = KeyEntry
         fields = ('__all__')
+        expandable_fields = {
+            'passwords': lambda: serializers.HyperlinkedRelatedField(
+                view_name='password-detail',
+                many=True,
+                read_only=True
+            ),
+        }
 
     passwords = PasswordSerializer(
         read_only=True,
         many=True
     )
 
-    passwords_write = serializers.ListField(
-        child=serializers.DictField(
-            child=serializers.CharField()    
-        ),
+    passwords_write = PasswordWriteSerializer(
+        many=True,
+        write_only=True,
+    )
+
+    signing_key = serializers.IntegerField(
         write_only=True,
+        required=False,
     )
+    """Public key the passwords were signed with, defaults to the first."""
 
     def validate(self, data):
-        # TODO: Lookup using permission system, or something like that
-        # List of users who needs this password
-#        users = [
-#            user, get_user_model().objects.get(pk=3)
-#        ]
-        users = get_user_model().objects.filter(public_keys__isnull=False)
-        users_set = set([x.pk for x in users])
+        # Every RSA key of every member of the owner group needs a password
+        recipients = self.get_recipients(data['owner'].pk)
         passwords = data['passwords_write']
-        passwords_keyset = set([int(x['user_pk']) for x in passwords])
+        passwords_keyset = set(
+            [(x['user_pk'], x['public_key']) for x in passwords]
+        )
 
-        if users_set != passwords_keyset:
-            extra = passwords_keyset - users_set
-            missing = users_set - passwords_keyset
+        if len(passwords_keyset) != len(passwords):
+            raise ValidationError(
+                _("Request contained duplicate passwords.")
+            )
+
+        if recipients != passwords_keyset:
+            extra = passwords_keyset - recipients
+            missing = recipients - passwords_keyset
             raise ValidationError(
                 _("Request did not contain required passwords. " + 
-                  "Extra passwords: " + str(list(extra)) + " "
-                  "Missing passwords: " + str(list(missing))
+                  "Extra passwords: " + str(sorted(extra)) + " "
+                  "Missing passwords: " + str(sorted(missing))
                 )
             )
 
-        # TODO: Check password signatures
         # Load uploaders public key
+        user = self.context['request'].user
+        signing_key = self.get_signing_key(user, data.get('signing_key'))
+        if signing_key is None:
+            raise ValidationError(
+                _("Uploader has no public key to verify signatures with.")
+            )
+        data['signing_key'] = signing_key
 
-        user =  self.context['request'].user
-        public_key = user.public_key.first().as_key()
+        self.verify_passwords(signing_key, passwords)
+        return data
 
-        for dicty in passwords:
-            user_pk = int(dicty['user_pk'])
-            encoded_password = dicty['password']
-            encoded_signature = dicty['signature']
+    def verify_passwords(self, signing_key, passwords):
+        """Check the password signatures, as one batch."""
+        results = verify_signatures(
+            (signing_key.key, x['password'], x['signature'])
+            for x in passwords
+        )
+        failed = failed_user_pks(passwords, results)
+        if failed:
+            raise ValidationError(invalid_signatures_message(failed))
 
-            if user_pk not in users_set:
-                raise ValidationError(
-                    _("Some users could not be looked up.")
-                )
+    def get_recipients(self, group_pk):
+        """Get the recipients required for key entries owned by the group."""
+        return get_recipients(group_pk)
 
-            password = Password(
-                key_entry=keyentry,
-                public_key=key,
-                password=encoded_password,
-                signature=encoded_signature,
-                signing_key = public_key
-            )
-            password.full_clean()
+    def get_signing_key(self, user, signing_key_pk=None):
+        """Get the public key to verify the uploaders signatures with.
 
-        return data
+        Users may have several keys, for instance an RSA key to receive
+        passwords with and an Ed25519 key to sign with, in which case the
+        signing key can be picked by its pk.
+        """
+        public_keys = user.public_keys.order_by('pk')
+        if signing_key_pk is not None:
+            public_keys = public_keys.filter(pk=signing_key_pk)
+        return public_keys.first()
 
     def create(self, validated_data):
-        passwords = validated_data['passwords_write']
-        del validated_data['passwords_write']
-        del validated_data['user']
-        with transaction.atomic(savepoint=True):
-            keyentry = KeyEntry.objects.create(**validated_data)
+        keyentry = create_key_entries([validated_data])[0]
+        # Reload with the passwords prefetched, for the response
+        return prefetch_passwords(
+            KeyEntry.objects.filter(pk=keyentry.pk)
+        ).get()
 
-            for dicty in passwords:
-                user_pk = dicty['user_pk']
-                password = dicty['password']
-                Password.objects.create(
-                    key_entry=keyentry,
-                    user=get_user_model().objects.get(pk=user_pk),
-                    password=password
-                )
 
-            return keyentry
+class KeyEntryImportSerializer(KeyEntrySerializer):
+    """Serializer for a single entry of a bulk import.
+
+    Signatures are not verified per entry, as the view verifies the
+    signatures of all entries as one batch. Recipients and signing keys are
+    resolved once per import, and shared through the :code:`resolved`
+    dictionary of the context.
+    """
+
+    def verify_passwords(self, signing_key, passwords):
+        pass
+
+    def resolve(self, key, resolver, *args):
+        """Call 'resolver' with 'args', once per 'key' and import."""
+        resolved = self.context['resolved']
+        if key not in resolved:
+            resolved[key] = resolver(*args)
+        return resolved[key]
+
+    def get_recipients(self, group_pk):
+        return self.resolve(
+            ('recipients', group_pk),
+            super(KeyEntryImportSerializer, self).get_recipients,
+            group_pk
+        )
+
+    def get_signing_key(self, user, signing_key_pk=None):
+        return self.resolve(
+            ('signing_key', signing_key_pk),
+            super(KeyEntryImportSerializer, self).get_signing_key,
+            user, signing_key_pk
+        )
+
+
+class KeyEntryBulkSerializer(serializers.Serializer):
+    """Serializer for the envelope of a bulk import."""
+
+    entries = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=getattr(settings, 'KEY_ENTRY_IMPORT_MAX', 1000),
+    )
+    """Key entries on the format taken by :code:`KeyEntrySerializer`."""
+
+    atomic = serializers.BooleanField(
+        default=False,
+    )
+    """Whether to create nothing at all, if any of the entries fail."""
 
 
 # ViewSets define the view behavior.
-class KeyEntryViewSet(mixins.CreateModelMixin,
+class KeyEntryViewSet(VaultVersionMixin,
+                      NormalizedListMixin,
+                      mixins.CreateModelMixin,
                       mixins.RetrieveModelMixin,
                       mixins.ListModelMixin,
                       mixins.DestroyModelMixin,
@@ -120,25 +349,164 @@ class KeyEntryViewSet(mixins.CreateModelMixin,
 
     queryset = KeyEntry.objects.none()
     serializer_class = KeyEntrySerializer
+    pagination_class = KeysetPagination
+
+    OWN_PASSWORDS = 'own'
+    """Value of :code:`?passwords=` to only get the callers own ciphertexts.
+
+    By default every key entry carries a password for every member of the
+    owner group, of which the caller can only decrypt their own. With
+    :code:`?passwords=own` only the key entries and passwords encrypted for
+    the caller are returned, such that the response size is independent of
+    the group sizes.
+    """
+
+    def own_passwords_only(self):
+        """Check whether the caller asked for their own passwords only."""
+        return (
+            self.request.query_params.get('passwords') == self.OWN_PASSWORDS
+        )
 
     def get_queryset_raw(self):
         """Filter the queryset for non-admin users.
 
         Non admin users can only see themself and staff users.
         """
-        user = self.request.user
-        # If staff, show everything
-        if user.is_staff:
-            return KeyEntry.objects.all()
-        # If user, only show our own passwords
-        return KeyEntry.objects.filter(
-            Q(passwords__user__pk=user.pk)
-        )
+        if self.own_passwords_only():
+            return recipient_key_entries(self.request.user)
+        return visible_key_entries(self.request.user)
 
     def get_queryset(self):
-        queryset = self.get_queryset_raw()
+        fields_spec, expand_spec = get_request_specs(self.request)
+        recipient = None
+        if self.own_passwords_only():
+            recipient = self.request.user
+        queryset = prefetch_passwords(
+            self.get_queryset_raw(), fields_spec, expand_spec, recipient,
+            self.normalizing()
+        )
         return queryset.order_by('pk')
 
+    @list_route(methods=['post'])
+    def bulk(self, request):
+        """Create many key entries in one request.
+
+        Takes :code:`{"entries": [...], "atomic": false}`, where every entry
+        is on the format taken by a single create. Recipients are validated
+        once per owner group, all signatures are verified as one batch, and
+        all valid entries are inserted in one transaction.
+
+        Failing entries, whether invalid or failing on insert, are reported
+        by their index, while the remaining entries are created, unless
+        :code:`atomic` is set, in which case nothing is created if any entry
+        fails.
+        """
+        envelope = KeyEntryBulkSerializer(data=request.data)
+        envelope.is_valid(raise_exception=True)
+        atomic = envelope.validated_data['atomic']
+
+        context = self.get_serializer_context()
+        context['resolved'] = {}
+        errors = OrderedDict()
+        valid = OrderedDict()
+        for index, entry in enumerate(envelope.validated_data['entries']):
+            serializer = KeyEntryImportSerializer(data=entry, context=context)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+
+        # Check the signatures of all entries, as one batch
+        items = [
+            (index, dicty)
+            for index, validated_data in valid.items()
+            for dicty in validated_data['passwords_write']
+        ]
+        results = verify_signatures(
+            (valid[index]['signing_key'].key,
+             dicty['password'], dicty['signature'])
+            for index, dicty in items
+        )
+        failed = OrderedDict()
+        for (index, dicty), error in zip(items, results):
+            if error is not None:
+                failed.setdefault(index, []).append(dicty['user_pk'])
+        for index, user_pks in failed.items():
+            del valid[index]
+            errors[index] = {
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    invalid_signatures_message(user_pks)
+                ]
+            }
+
+        created = []
+        if valid and not (atomic and errors):
+            key_entries, write_errors = self.create_entries(valid, atomic)
+            errors.update(write_errors)
+            for index, keyentry in key_entries:
+                created.append(OrderedDict([
+                    ('index', index),
+                    ('url', reverse(
+                        'keyentry-detail',
+                        args=[keyentry.pk],
+                        request=request
+                    )),
+                ]))
+
+        if not errors:
+            status_code = status.HTTP_201_CREATED
+        elif created:
+            status_code = status.HTTP_207_MULTI_STATUS
+        else:
+            status_code = status.HTTP_400_BAD_REQUEST
+        return Response(OrderedDict([
+            ('created', created),
+            ('errors', [
+                OrderedDict([('index', index), ('errors', error)])
+                for index, error in sorted(errors.items())
+            ]),
+        ]), status=status_code)
+
+    def create_entries(self, valid, atomic):
+        """Create the 'valid' entries, in one go if possible.
+
+        Should any of them fail on insert, they are created one by one, such
+        that the failing ones can be reported. If 'atomic', nothing is
+        created in that case.
+
+        Returns:
+            tuple: A list of :code:`(index, key entry)` tuples, and a dict of
+                errors by index.
+        """
+        try:
+            key_entries = create_key_entries(valid.values())
+            return list(zip(valid.keys(), key_entries)), {}
+        except (ValidationError, IntegrityError):
+            pass
+
+        created = []
+        errors = OrderedDict()
+        with transaction.atomic():
+            for index, validated_data in valid.items():
+                try:
+                    keyentry = create_key_entries([validated_data])[0]
+                except ValidationError as error:
+                    errors[index] = {
+                        api_settings.NON_FIELD_ERRORS_KEY: error.messages
+                    }
+                except IntegrityError:
+                    errors[index] = {
+                        api_settings.NON_FIELD_ERRORS_KEY: [
+                            _("Key entry conflicts with existing data.")
+                        ]
+                    }
+                else:
+                    created.append((index, keyentry))
+            if atomic and errors:
+                transaction.set_rollback(True)
+                created = []
+        return created, errors
+
     def perform_create(self, serializer):
         # Send from the current user
         serializer.save(
@@ -14,15 +14,56 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 from api.models import Password
 from api.views.PublicKey import PublicKeySerializer
+from api.views.fields import Base64Field
+from api.views.conditional import VaultVersionMixin
+from api.views.normalize import NormalizedKeysMixin
+from api.views.normalize import NormalizedListMixin
+from api.views.pagination import KeysetPagination
+from api.views.sparse import SparseFieldsMixin
+from api.views.sparse import field_expanded
+from api.views.sparse import field_requested
+from api.views.sparse import get_request_specs
+
+
+def visible_passwords(user):
+    """Get the passwords visible to 'user'."""
+    # If staff, show everything
+    if user.is_staff:
+        return Password.objects.all()
+    # If user, only show our own passwords
+    return Password.objects.filter(
+        Q(recipient_user_id=user.pk)
+    )
 
 
 # Serializers define the API representation.
-class PasswordSerializer(serializers.HyperlinkedModelSerializer):
+class PasswordSerializer(NormalizedKeysMixin,
+                         SparseFieldsMixin,
+                         serializers.HyperlinkedModelSerializer):
     """Serializer to present users (get_user_model())."""
 
     class Meta:
         model = Password
         fields = ('__all__')
+        expandable_fields = {
+            'signing_key': lambda: serializers.HyperlinkedRelatedField(
+                view_name='publickey-detail',
+                read_only=True
+            ),
+            'public_key': lambda: serializers.HyperlinkedRelatedField(
+                view_name='publickey-detail',
+                read_only=True
+            ),
+        }
+        normalized_key_fields = ('signing_key', 'public_key')
+
+    password = Base64Field(
+        read_only=True
+    )
+
+    signature = Base64Field(
+        read_only=True
+    )
 
     signing_key = PublicKeySerializer(
         read_only=True
@@ -34,7 +75,9 @@ class PasswordSerializer(serializers.HyperlinkedModelSerializer):
 
 
 # ViewSets define the view behavior.
-class PasswordViewSet(viewsets.ReadOnlyModelViewSet):
+class PasswordViewSet(VaultVersionMixin,
+                      NormalizedListMixin,
+                      viewsets.ReadOnlyModelViewSet):
     """Get a list of all passwords visible to the current user.
 
     If the current user is staff, all users are visible.
@@ -48,21 +91,45 @@ class PasswordViewSet(viewsets.ReadOnlyModelViewSet):
 
     queryset = Password.objects.none()
     serializer_class = PasswordSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset_raw(self):
         """Filter the queryset for non-admin users.
 
         Non admin users can only see themself and staff users.
         """
-        user = self.request.user
-        # If staff, show everything
-        if user.is_staff:
-            return Password.objects.all()
-        # If user, only show our own passwords
-        return Password.objects.filter(
-            Q(user__pk=user.pk)
-        )
+        return visible_passwords(self.request.user)
+
+    @staticmethod
+    def optimize_queryset(queryset, fields_spec=None, expand_spec=None,
+                          normalize=False):
+        """Join in expanded keys and skip unrequested ciphertexts.
+
+        Args:
+            fields_spec: Parsed :code:`?fields=` spec for passwords.
+            expand_spec: Parsed :code:`?expand=` spec for passwords.
+            normalize: Whether keys are referred to by pk, and thus need not
+                be joined in.
+        """
+        related = [
+            name for name in ('public_key', 'signing_key')
+            if field_requested(fields_spec, name) and
+            field_expanded(expand_spec, name) and not normalize
+        ]
+        if related:
+            queryset = queryset.select_related(*related)
+        deferred = [
+            name for name in ('password', 'signature')
+            if not field_requested(fields_spec, name)
+        ]
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        return queryset
 
     def get_queryset(self):
-        queryset = self.get_queryset_raw()
+        fields_spec, expand_spec = get_request_specs(self.request)
+        queryset = self.optimize_queryset(
+            self.get_queryset_raw(), fields_spec, expand_spec,
+            self.normalizing()
+        )
         return queryset.order_by('pk')
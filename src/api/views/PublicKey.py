@@ -3,23 +3,63 @@
 # TODO: Do translations wherever required.
 from __future__ import unicode_literals
 
+import hashlib
+
 from django.forms import widgets
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db import transaction
 from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.encoding import smart_text
+from django.utils.translation import ugettext as _
+from django.views.decorators.http import condition
 
 from rest_framework import serializers
 from rest_framework import viewsets
 from rest_framework import mixins
+from rest_framework.response import Response
 
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
 
 from api.models import PublicKey
 from api.models import util
+from api.views.pagination import KeysetPagination
+from api.views.sparse import SparseFieldsMixin
+
+
+def fingerprint_etag(request, fingerprint=None):
+    """ETag function for :code:`condition`, on the fingerprint lookup.
+
+    The key material at a fingerprint never changes, but the representation
+    does: it includes the owner and the url, which change if the key is
+    deleted and registered again, and varies by format and sparse fields.
+    """
+    row = PublicKey.objects.filter(
+        fingerprint=fingerprint
+    ).values_list('pk', 'user_id').first()
+    if row is None:
+        return None
+    parts = [
+        fingerprint,
+        smart_text(row[0]),
+        smart_text(row[1]),
+        getattr(request, 'accepted_media_type', ''),
+        request.GET.get('fields', ''),
+        request.GET.get('expand', ''),
+    ]
+    return hashlib.sha256(
+        '\n'.join(parts).encode('utf-8')
+    ).hexdigest()
 
 
 # Serializers define the API representation.
-class PublicKeySerializer(serializers.HyperlinkedModelSerializer):
+class PublicKeySerializer(SparseFieldsMixin,
+                           serializers.HyperlinkedModelSerializer):
     """
     """
 
@@ -36,6 +76,9 @@ class PublicKeySerializer(serializers.HyperlinkedModelSerializer):
             util.parse_key(key_string)
         except ValueError as value_error:
             raise ValidationError(str(value_error))
+        fingerprint = util.fingerprint(key_string)
+        if PublicKey.objects.filter(fingerprint=fingerprint).exists():
+            raise ValidationError(_("This public key is already registered."))
         return key_string
 
 
@@ -54,9 +97,33 @@ class PublicKeyViewSet(mixins.CreateModelMixin,
 
     queryset = PublicKey.objects.all().order_by('pk')
     serializer_class = PublicKeySerializer
+    pagination_class = KeysetPagination
+
+    @method_decorator(condition(etag_func=fingerprint_etag))
+    def by_fingerprint(self, request, fingerprint=None):
+        """Lookup a public key by its fingerprint.
+
+        Clients may keep the response, and revalidate it using the ETag,
+        which is specific to the key registration and the representation.
+        """
+        public_key = get_object_or_404(
+            self.get_queryset(), fingerprint=fingerprint
+        )
+        serializer = self.get_serializer(public_key)
+        response = Response(serializer.data)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept',))
+        return response
 
     def perform_create(self, serializer):
         # Send from the current user
-        serializer.save(
-            user=self.request.user,
-        )
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    user=self.request.user,
+                )
+        except IntegrityError:
+            # Registered concurrently, after validate_key checked for it
+            raise serializers.ValidationError(
+                {'key': [_("This public key is already registered.")]}
+            )
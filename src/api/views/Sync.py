@@ -0,0 +1,121 @@
+"""API endpoint for synchronizing vaults."""
+# pylint: disable=W9903
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.encoding import smart_text
+from django.utils.translation import ugettext as _
+
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import _positive_int
+from rest_framework.response import Response
+
+from api.models import Change
+from api.models.changes import sequence_changes
+from api.views.KeyEntry import KeyEntrySerializer
+from api.views.KeyEntry import prefetch_passwords
+from api.views.KeyEntry import visible_key_entries
+from api.views.Password import PasswordSerializer
+from api.views.Password import visible_passwords
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """Get the key entries and passwords changed since a sync token.
+
+    Call without :code:`since` to get the current token only, then download
+    the vault through the list endpoints. Afterwards, pass the latest token
+    as :code:`?since=<token>` to get everything which changed since.
+
+    The response contains the changed key entries (with their passwords) and
+    passwords, along with the ids of deleted ones. Changes are paginated, if
+    :code:`more` is true, call again with the new :code:`token` right away.
+    The page size can be chosen using :code:`?page_size=`.
+
+    Users only receive changes to key entries they have access to, and
+    gaining or losing access shows up as the key entry being created or
+    deleted. Staff receive every change.
+    """
+
+    def get_changes(self, since, latest, page_size):
+        """Get the page of changes after 'since', visible to the user."""
+        changes = Change.objects.filter(
+            sequence__gt=since, sequence__lte=latest
+        )
+        user = self.request.user
+        if user.is_staff:
+            changes = changes.filter(user__isnull=True)
+        else:
+            changes = changes.filter(user__pk=user.pk)
+        return list(changes.order_by('sequence')[:page_size])
+
+    def get_page_size(self):
+        try:
+            return _positive_int(
+                self.request.query_params['page_size'],
+                strict=True,
+                cutoff=getattr(settings, 'MAX_PAGE_SIZE', 1000)
+            )
+        except (KeyError, ValueError):
+            return settings.REST_FRAMEWORK['PAGE_SIZE']
+
+    def list(self, request):
+        latest = sequence_changes()
+
+        since = request.query_params.get('since')
+        if since is None:
+            return Response(OrderedDict([
+                ('token', smart_text(latest)),
+            ]))
+        try:
+            since = _positive_int(since)
+        except ValueError:
+            raise ValidationError({'since': _("Invalid sync token.")})
+
+        page_size = self.get_page_size()
+        changes = self.get_changes(since, latest, page_size)
+        more = len(changes) == page_size
+
+        # Only the latest change of each object matters
+        latest_actions = OrderedDict()
+        for change in changes:
+            key = (change.model, change.object_id)
+            latest_actions.pop(key, None)
+            latest_actions[key] = change.action
+
+        def object_ids(model, action):
+            return [
+                object_id
+                for (change_model, object_id), change_action
+                in latest_actions.items()
+                if change_model == model and change_action == action
+            ]
+
+        key_entries = prefetch_passwords(
+            visible_key_entries(request.user).filter(
+                pk__in=object_ids(Change.KEY_ENTRY, Change.UPSERT)
+            ).distinct()
+        ).order_by('pk')
+        passwords = visible_passwords(request.user).filter(
+            pk__in=object_ids(Change.PASSWORD, Change.UPSERT)
+        ).select_related('public_key', 'signing_key').order_by('pk')
+
+        context = {'request': request}
+        # Without more changes, the user has seen everything up to latest
+        token = changes[-1].sequence if more else latest
+        return Response(OrderedDict([
+            ('token', smart_text(token)),
+            ('more', more),
+            ('key_entries', KeyEntrySerializer(
+                key_entries, many=True, context=context
+            ).data),
+            ('passwords', PasswordSerializer(
+                passwords, many=True, context=context
+            ).data),
+            ('deleted', OrderedDict([
+                ('key_entries', object_ids(Change.KEY_ENTRY, Change.DELETE)),
+                ('passwords', object_ids(Change.PASSWORD, Change.DELETE)),
+            ])),
+        ]))
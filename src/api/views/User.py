@@ -6,9 +6,12 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from rest_framework import viewsets
 
+from api.views.sparse import SparseFieldsMixin
+
 
 # Serializers define the API representation.
-class UserSerializer(serializers.HyperlinkedModelSerializer):
+class UserSerializer(SparseFieldsMixin,
+                      serializers.HyperlinkedModelSerializer):
     """Serializer to present users (get_user_model())."""
 
     class Meta:
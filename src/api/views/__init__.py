@@ -3,3 +3,5 @@ from api.views.Group import GroupViewSet
 from api.views.Password import PasswordViewSet
 from api.views.KeyEntry import KeyEntryViewSet
 from api.views.PublicKey import PublicKeyViewSet
+from api.views.Sync import SyncViewSet
+from api.views.Export import ExportViewSet
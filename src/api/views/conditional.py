@@ -0,0 +1,93 @@
+"""Conditional request support for the API endpoints."""
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.utils.cache import patch_cache_control
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.encoding import smart_text
+from django.views.decorators.http import condition
+
+from api.models import VaultVersion
+from api.models.changes import get_change_version
+
+
+def get_vault_version(request):
+    """Get the vault version of the requesting user, once per request."""
+    if not hasattr(request, '_vault_version'):
+        request._vault_version = VaultVersion.get_current(request.user.pk)
+    return request._vault_version
+
+
+def representation_tag(request):
+    """Hash the format and query parameters, which shape the response.
+
+    Sparse fields, expansion, normalization, the passwords mode and the
+    cursor all change the representation of the same vault version.
+    """
+    parts = [getattr(request, 'accepted_media_type', '')]
+    for key, values in sorted(request.GET.lists()):
+        parts.extend(key + '=' + value for value in values)
+    return hashlib.sha256(
+        '\n'.join(parts).encode('utf-8')
+    ).hexdigest()[:16]
+
+
+def vault_etag(request, *_args, **_kwargs):
+    """ETag function for :code:`condition`.
+
+    Staff can see everything, so their vaults change with every change, and
+    are versioned by the change log instead. The ETags of staff and
+    ordinary users differ, such that promotions and demotions never match.
+    """
+    if request.user.is_staff:
+        latest, pending = get_change_version()
+        version = (smart_text(request.user.pk) + '-staff-' +
+                   smart_text(latest) + '.' + smart_text(pending))
+    else:
+        version = get_vault_version(request).etag
+    return version + '-' + representation_tag(request)
+
+
+def vault_last_modified(request, *_args, **_kwargs):
+    """Last modified function for :code:`condition`, None for staff."""
+    if request.user.is_staff:
+        return None
+    return get_vault_version(request).modified
+
+
+vault_condition = condition(
+    etag_func=vault_etag,
+    last_modified_func=vault_last_modified
+)
+"""Decorator answering conditional requests using the vault version."""
+
+
+class VaultVersionMixin(object):
+    """Answer conditional list and retrieve requests by the vault version.
+
+    The vault version of the user is bumped whenever anything visible to them
+    changes, so if the client already has the current version, a 304 can be
+    returned without querying the key entries or passwords at all.
+    """
+
+    @method_decorator(vault_condition)
+    def list(self, request, *args, **kwargs):
+        response = super(VaultVersionMixin, self).list(
+            request, *args, **kwargs
+        )
+        # Clients may keep the response, but must revalidate it
+        patch_cache_control(response, private=True, no_cache=True)
+        # The ETag is specific to the format, see representation_tag
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+    @method_decorator(vault_condition)
+    def retrieve(self, request, *args, **kwargs):
+        response = super(VaultVersionMixin, self).retrieve(
+            request, *args, **kwargs
+        )
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept',))
+        return response
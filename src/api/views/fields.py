@@ -0,0 +1,44 @@
+"""Custom serializer fields."""
+from __future__ import unicode_literals
+
+import base64
+import binascii
+
+from django.utils import six
+from django.utils.translation import ugettext_lazy as _lazy
+
+from rest_framework import serializers
+
+from api.models import util
+from api.binary import parses_binary
+from api.binary import renders_binary
+
+
+class Base64Field(serializers.Field):
+    """Binary data, stored raw but transferred as base64 encoded text.
+
+    Binary wire formats carry the data as raw bytes instead, see
+    :code:`api.binary`.
+    """
+
+    default_error_messages = {
+        'invalid': _lazy("Not valid base64 encoded data."),
+    }
+
+    def to_representation(self, value):
+        value = util.to_bytes(value)
+        if renders_binary(self.context):
+            return bytearray(value)
+        return base64.b64encode(value).decode('ascii')
+
+    def to_internal_value(self, data):
+        if parses_binary(self.context):
+            if not isinstance(data, six.binary_type):
+                self.fail('invalid')
+            return data
+        if not isinstance(data, six.string_types):
+            self.fail('invalid')
+        try:
+            return base64.b64decode(data.encode('ascii'))
+        except (TypeError, ValueError, binascii.Error):
+            self.fail('invalid')
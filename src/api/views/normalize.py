@@ -0,0 +1,148 @@
+"""Side-loaded (normalized) response format for the list endpoints.
+
+Every password refers to two public keys, its recipient and its signer, and
+by default both are serialized nested. On a key entry list, the same handful
+of keys is thus serialized over and over again, once per password.
+
+With :code:`?normalize=true` passwords refer to their keys by pk instead, and
+every referenced public key and user is serialized once, in an "included"
+map next to the results:
+
+.. code:: json
+
+    {
+        "next": null,
+        "previous": null,
+        "results": [...],
+        "included": {
+            "public_keys": {"1": {"url": ..., "user": 1, "key": ...}},
+            "users": {"1": {"url": ..., "username": ...}}
+        }
+    }
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.utils.encoding import smart_text
+
+from rest_framework import serializers
+
+from api.models import PublicKey
+from api.views.PublicKey import PublicKeySerializer
+from api.views.User import UserSerializer
+
+NORMALIZE_PARAM = 'normalize'
+TRUE_VALUES = ('1', 'true', 'yes')
+
+INCLUDED_KEYS = 'included_public_keys'
+"""Serializer context entry collecting the pks of referenced public keys."""
+
+
+def normalize_requested(request):
+    """Check whether 'request' asked for the normalized format."""
+    if request is None:
+        return False
+    value = request.query_params.get(NORMALIZE_PARAM, '')
+    return value.lower() in TRUE_VALUES
+
+
+class NormalizedKeysMixin(object):
+    """Serializer mixin referring to public keys by pk when normalizing.
+
+    The public key fields are listed in :code:`Meta.normalized_key_fields`.
+    The pks of the referenced keys are collected in the root serializer
+    context, for :code:`get_included` to serialize afterwards.
+    """
+
+    def normalizing(self):
+        """Check whether the view is collecting keys for the included map."""
+        return INCLUDED_KEYS in self.context
+
+    def get_fields(self):
+        fields = super(NormalizedKeysMixin, self).get_fields()
+        if self.normalizing():
+            for name in self.Meta.normalized_key_fields:
+                if name in fields:
+                    fields[name] = serializers.PrimaryKeyRelatedField(
+                        read_only=True
+                    )
+        return fields
+
+    def to_representation(self, instance):
+        data = super(NormalizedKeysMixin, self).to_representation(instance)
+        if self.normalizing():
+            included = self.context[INCLUDED_KEYS]
+            for name in self.Meta.normalized_key_fields:
+                if data.get(name) is not None:
+                    included.add(data[name])
+        return data
+
+
+def get_included(public_key_pks, context):
+    """Serialize the public keys 'public_key_pks' and their users once each.
+
+    Returns:
+        OrderedDict: The "included" map, with the objects keyed by pk.
+    """
+    public_keys = list(
+        PublicKey.objects.filter(pk__in=public_key_pks).order_by('pk')
+    )
+    users = get_user_model().objects.filter(
+        pk__in=set(public_key.user_id for public_key in public_keys)
+    ).prefetch_related('groups', 'user_permissions').order_by('pk')
+
+    def serialize(serializer_class, instances):
+        serializer = serializer_class(instances, many=True, context=context)
+        # The ?fields= of the request apply to the results only
+        serializer.child._sparse_specs = (None, None)
+        return serializer.data
+
+    included_keys = OrderedDict()
+    for public_key, data in zip(
+            public_keys, serialize(PublicKeySerializer, public_keys)):
+        data['user'] = public_key.user_id
+        included_keys[smart_text(public_key.pk)] = data
+
+    included_users = OrderedDict(
+        (smart_text(user.pk), data)
+        for user, data in zip(users, serialize(UserSerializer, users))
+    )
+    return OrderedDict([
+        ('public_keys', included_keys),
+        ('users', included_users),
+    ])
+
+
+class NormalizedListMixin(object):
+    """Viewset mixin adding the "included" map to normalized lists.
+
+    Only lists are normalized, single objects are always rendered nested.
+    """
+
+    def normalizing(self):
+        """Check whether a normalized list was requested."""
+        return self.action == 'list' and normalize_requested(self.request)
+
+    def list(self, request, *args, **kwargs):
+        if not self.normalizing():
+            return super(NormalizedListMixin, self).list(
+                request, *args, **kwargs
+            )
+        # Collect the referenced keys, while serializing the results
+        self._included_public_keys = set()
+        response = super(NormalizedListMixin, self).list(
+            request, *args, **kwargs
+        )
+        context = super(NormalizedListMixin, self).get_serializer_context()
+        response.data['included'] = get_included(
+            self._included_public_keys, context
+        )
+        return response
+
+    def get_serializer_context(self):
+        context = super(NormalizedListMixin, self).get_serializer_context()
+        if self.normalizing():
+            context[INCLUDED_KEYS] = self._included_public_keys
+        return context
@@ -0,0 +1,57 @@
+"""Pagination classes for the API endpoints."""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from django.conf import settings
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.pagination import _positive_int
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    """Opaque cursor pagination on the primary key.
+
+    Unlike offset pagination, fetching a page is a single index range scan no
+    matter how deep into the list it is, and no total count is computed,
+    unless it is explicitly requested by passing :code:`?count=true`.
+
+    The page size can be chosen by clients using :code:`?page_size=`, up to
+    :code:`MAX_PAGE_SIZE`.
+    """
+
+    ordering = 'pk'
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 1000)
+    count_query_param = 'count'
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        requested = request.query_params.get(self.count_query_param, '')
+        if requested.lower() in ('1', 'true', 'yes'):
+            self.count = queryset.count()
+        return super(KeysetPagination, self).paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_paginated_response(self, data):
+        content = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            content['count'] = self.count
+        content['results'] = data
+        return Response(content)
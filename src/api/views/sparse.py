@@ -0,0 +1,120 @@
+"""Sparse fieldsets and opt-in expansion for the API serializers.
+
+Clients can limit the fields they receive using :code:`?fields=`, and choose
+which nested relations are expanded using :code:`?expand=`. Both take a comma
+separated list of field names, where nested fields are addressed using dots.
+
+Examples:
+    * :code:`?fields=title,url,username` only renders those three fields,
+      skipping the nested passwords entirely.
+    * :code:`?expand=passwords` renders the passwords nested, but their
+      keys as hyperlinks.
+    * :code:`?expand=passwords.public_key` also expands the recipient keys.
+
+Without :code:`?expand=` every relation is expanded, as it always has been.
+Relations which are not expanded are rendered as hyperlinks instead.
+"""
+from __future__ import unicode_literals
+
+
+def parse_spec(value):
+    """Parse a spec such as 'a,b.c,b.d' into {'a': {}, 'b': {'c': {}, ...}}.
+
+    Returns:
+        dict: The parsed tree, or None if 'value' is None.
+    """
+    if value is None:
+        return None
+    spec = {}
+    for path in value.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        node = spec
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    return spec
+
+
+def get_request_specs(request):
+    """Get the parsed :code:`(fields, expand)` specs of 'request'."""
+    if request is None:
+        return None, None
+    return (
+        parse_spec(request.query_params.get('fields')),
+        parse_spec(request.query_params.get('expand')),
+    )
+
+
+def field_requested(fields_spec, name):
+    """Check whether the field 'name' should be rendered."""
+    return fields_spec is None or name in fields_spec
+
+
+def field_expanded(expand_spec, name):
+    """Check whether the relation 'name' should be rendered nested."""
+    return expand_spec is None or name in expand_spec
+
+
+def child_fields_spec(fields_spec, name):
+    """Get the fields spec of the nested field 'name'.
+
+    Naming a nested field without any of its subfields selects all of them.
+    """
+    if fields_spec is None:
+        return None
+    return fields_spec.get(name) or None
+
+
+def child_expand_spec(expand_spec, name):
+    """Get the expand spec of the nested field 'name'."""
+    if expand_spec is None:
+        return None
+    return expand_spec.get(name, {})
+
+
+class SparseFieldsMixin(object):
+    """Serializer mixin implementing :code:`?fields=` and :code:`?expand=`.
+
+    Relations which can be collapsed are listed in
+    :code:`Meta.expandable_fields`, mapping the field name to a function
+    creating the field to render it with when not expanded.
+
+    Write only fields are never removed, such that the query parameters do
+    not interfere with creation.
+    """
+
+    def get_specs(self):
+        """Get the :code:`(fields, expand)` specs applying to this serializer.
+
+        Nested serializers are handed their specs by their parent, while the
+        root serializer reads them from the request.
+        """
+        if hasattr(self, '_sparse_specs'):
+            return self._sparse_specs
+        return get_request_specs(self.context.get('request'))
+
+    def get_fields(self):
+        fields = super(SparseFieldsMixin, self).get_fields()
+        fields_spec, expand_spec = self.get_specs()
+
+        for name in list(fields.keys()):
+            if fields[name].write_only:
+                continue
+            if not field_requested(fields_spec, name):
+                del fields[name]
+
+        expandable_fields = getattr(self.Meta, 'expandable_fields', {})
+        for name, collapsed_field in expandable_fields.items():
+            if name in fields and not field_expanded(expand_spec, name):
+                fields[name] = collapsed_field()
+
+        # Hand down the specs to nested serializers
+        for name, field in fields.items():
+            nested = getattr(field, 'child', field)
+            if isinstance(nested, SparseFieldsMixin):
+                nested._sparse_specs = (
+                    child_fields_spec(fields_spec, name),
+                    child_expand_spec(expand_spec, name),
+                )
+        return fields
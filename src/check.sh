@@ -8,4 +8,6 @@
 ./tools/unicode_check.sh
 ./tools/reverse_model_checker.sh api/models/
 ./tools/makemigrations_needed.sh
+# Timings vary between machines, so the budget is opt-in
+./tools/bench_startup.py --repeat 5 ${STARTUP_BUDGET:+--budget "$STARTUP_BUDGET"}
 ./licence/check_mapping.py
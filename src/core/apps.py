@@ -9,13 +9,22 @@ from django.dispatch import receiver
 class CoreConfig(AppConfig):
     name = 'core'
 
+    def ready(self):
+        from django.contrib.sessions.models import Session
+        from core import validation
+
+        validation.register(Session, validation.NO_VALIDATION)
+
 
 old_debug = True
 
 @receiver([pre_save])
 def pre_save_full_clean_handler(sender, instance, *args, **kwargs):
-    """Force all models to call full_clean before save, when in DEBUG mode."""
-    from django.contrib.sessions.models import Session
+    """Validate all models before save, according to their policy.
+
+    See core.validation for the per-model policies.
+    """
+    from core.validation import validate_on_save
     if 'raw' in kwargs and kwargs['raw']:
         return
 
@@ -25,6 +34,4 @@ def pre_save_full_clean_handler(sender, instance, *args, **kwargs):
         print("Debug went from " + str(old_debug) + " to " + str(settings.DEBUG))
         old_debug = settings.DEBUG
 
-    if sender != Session:
-        # and settings.DEBUG is True:
-        instance.full_clean()
+    validate_on_save(instance)
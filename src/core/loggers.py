@@ -4,3 +4,6 @@ import logging
 
 auth_logger = logging.getLogger('authentication')
 """Logger for authentication specific messages."""
+
+validation_logger = logging.getLogger('validation')
+"""Logger for the validation of models on save, see core.validation."""
@@ -2,13 +2,14 @@
 # pylint: disable=W9903
 # TODO: Abstract baseclass Service with ProcessService
 import sys
-import docker
-
-from requests.adapters import ConnectionError
 
 
 class DockerService(object):
-    """Docker service mixin class."""
+    """Docker service mixin class.
+
+    The docker client library is heavy to import, it is only imported once
+    a command actually talks to docker, not when the command is loaded.
+    """
 
     service_name = None
     image = None
@@ -18,14 +19,21 @@ class DockerService(object):
 
     def __init__(self):
         super(DockerService, self).__init__()
-        # Setup docker client
-        self.client = docker.from_env(version='auto')
+        self._client = None
         # Setup dockerid path
         # pylint: disable=no-name-in-module
         from hagrid.settings import BASE_DIR
         self.dockerid_path = (BASE_DIR + '/database/' +
                               self.service_name + '_dockerid')
 
+    @property
+    def client(self):
+        """The docker client, created on first use."""
+        if self._client is None:
+            import docker
+            self._client = docker.from_env(version='auto')
+        return self._client
+
     def _write_dockerid(self, container):
         """Write the containers id to a file."""
         with open(self.dockerid_path, "w") as text_file:
@@ -43,6 +51,7 @@ class DockerService(object):
 
     def log(self, identifier):
         """Print the log of the docker instance."""
+        import docker
         try:
             container = self.client.containers.get(identifier)
             print container.logs()
@@ -59,6 +68,7 @@ class DockerService(object):
 
     def start(self):
         """Start the docker instance."""
+        from requests.adapters import ConnectionError
         # Check validity of image name
         # pylint: disable=unsupported-membership-test
         if ":" not in self.image:
@@ -99,6 +109,7 @@ class DockerService(object):
 
     def get_container(self, identifier):
         """Get the docker container instance from the identifier."""
+        import docker
         try:
             container = self.client.containers.get(identifier)
             return container
@@ -118,6 +129,7 @@ class DockerService(object):
 
     def is_running(self, identifier):
         """Get the status of the docker instance."""
+        import docker
         try:
             container = self.client.containers.get(identifier)
             return container.status == 'running'
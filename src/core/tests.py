@@ -1,6 +1,107 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import os
+import sys
+
+import mock
+
+from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.utils import six
+
+from core import validation
+from hagrid import importtime
+from hagrid.importtime import builtins
+
+
+class ValidationPolicyTest(TestCase):
+    """Saves must be validated according to the policy, unless skipped."""
+
+    def setUp(self):
+        validation.reset_stats()
+
+    def test_validated_on_save(self):
+        with self.assertRaises(ValidationError):
+            Group(name='').save()
+        Group(name='valid').save()
+        self.assertEqual(validation.get_stats()['auth.Group']['validated'], 2)
+
+    def test_skipped(self):
+        with validation.skipped(Group):
+            Group(name='').save()
+        stats = validation.get_stats()['auth.Group']
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(stats['validated'], 0)
+
+    def test_skipped_nested(self):
+        with validation.skipped(Group):
+            with validation.skipped():
+                pass
+            with validation.skipped(Group):
+                pass
+            Group(name='').save()
+        with self.assertRaises(ValidationError):
+            Group(name='').save()
+        stats = validation.get_stats()['auth.Group']
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(stats['validated'], 1)
+
+    def test_registered_policy(self):
+        validation.register(Group, validation.NO_VALIDATION)
+        try:
+            Group(name='').save()
+        finally:
+            validation.register(Group, validation.FULL_CLEAN)
+        self.assertEqual(validation.get_stats()['auth.Group']['skipped'], 1)
+
+
+class ImportTimeTest(TestCase):
+    """Imports must be timed while profiling, and restored after."""
+
+    def setUp(self):
+        importtime._TIMINGS[:] = []
+        self.original_import = builtins.__import__
+        for name in ('colorsys', 'json.tool'):
+            sys.modules.pop(name, None)
+        if hasattr(sys.modules['json'], 'tool'):
+            del sys.modules['json'].tool
+
+    def tearDown(self):
+        builtins.__import__ = self.original_import
+        importtime._STATE['original_import'] = None
+
+    def profile(self, value):
+        stream = six.StringIO()
+        with mock.patch.dict(os.environ, {
+                importtime.ENVIRONMENT_VARIABLE: value
+        }):
+            importtime.install()
+            __import__('colorsys')
+            __import__(str('json'), fromlist=[str('tool')])
+            importtime.report(stream)
+        return stream.getvalue()
+
+    def test_disabled(self):
+        with mock.patch.dict(os.environ, {
+                importtime.ENVIRONMENT_VARIABLE: ''
+        }):
+            importtime.install()
+        self.assertIs(builtins.__import__, self.original_import)
+
+    def test_report(self):
+        output = self.profile('1')
+        self.assertIs(builtins.__import__, self.original_import)
+        names = [timing[0] for timing in importtime.get_timings()]
+        self.assertIn('colorsys', names)
+        # Only the submodule is new, when importing from a loaded package
+        self.assertIn('json.{tool}', names)
+        self.assertIn('colorsys', output)
 
-# Create your tests here.
+    def test_limit(self):
+        output = self.profile('2')
+        lines = output.splitlines()
+        # Header, the two slowest imports, and the summary
+        self.assertEqual(len(lines), 4)
+        self.assertIn('modules', lines[-1])
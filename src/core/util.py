@@ -2,6 +2,7 @@
 
 import signal
 import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 
 from django.http import HttpResponse
@@ -16,6 +17,93 @@ class Empty(object):
     pass
 
 
+class LRUCache(object):
+    """Bounded, thread-safe, least-recently-used cache.
+
+    Keeps running counters of hits, misses and evictions, which can be read
+    out using :code:`stats()`.
+
+    Examples:
+        .. code:: python
+
+            cache = LRUCache(maxsize=128)
+            value = cache.get_or_compute(key, lambda: expensive(key))
+
+    Note:
+        Values are computed outside the lock, so two threads missing on the
+        same key at once may both compute it; the last one wins.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize):
+        """Constructor, sets up the storage and counters."""
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Get the value for 'key', marking it as recently used."""
+        with self._lock:
+            value = self._data.pop(key, self._MISSING)
+            if value is self._MISSING:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Insert 'value' for 'key', evicting the oldest entries if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, func):
+        """Get the value for 'key', calling 'func' to produce it on a miss.
+
+        Exceptions thrown by 'func' are propagated, and nothing is cached.
+        """
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = func()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return a dictionary of the current cache counters."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+
 def set_interval(func, sec):
     """Call the function 'func' every 'sec' seconds.
 
@@ -0,0 +1,153 @@
+"""Per-model validation policies, applied before every save.
+
+Every model is validated on save by :code:`core.apps`, according to the
+policy registered for it. Models without a registered policy get
+:code:`FULL_CLEAN`, that is, a complete :code:`full_clean()`. Models can
+register a cheaper policy, for instance leaving out the foreign key
+existence checks and unique lookups which the database enforces anyway:
+
+.. code:: python
+
+    validation.register(Password, ValidationPolicy(
+        exclude=['key_entry', 'public_key'],
+        validate_unique=False,
+    ))
+
+Callers which already validated the instances, such as serializers and bulk
+paths, can skip validation of their saves:
+
+.. code:: python
+
+    with validation.skipped(KeyEntry):
+        keyentry.save()
+
+Every validation and skip is counted and timed per model, see
+:code:`get_stats()`, and logged to the :code:`validation` logger.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from core.loggers import validation_logger
+
+
+class ValidationPolicy(object):
+    """What to validate when saving instances of a model.
+
+    Args:
+        exclude (list): Fields not to validate, typically foreign keys.
+        validate_unique (bool): Whether to run the unique lookup queries.
+        enabled (bool): Whether to validate at all.
+    """
+
+    def __init__(self, exclude=None, validate_unique=True, enabled=True):
+        self.exclude = exclude
+        self.validate_unique = validate_unique
+        self.enabled = enabled
+
+    def validate(self, instance):
+        """Validate 'instance' according to this policy.
+
+        Raises:
+            ValidationError: If the instance is invalid.
+        """
+        instance.full_clean(
+            exclude=self.exclude,
+            validate_unique=self.validate_unique
+        )
+
+
+FULL_CLEAN = ValidationPolicy()
+"""Validate everything, used for models without a registered policy."""
+
+NO_VALIDATION = ValidationPolicy(enabled=False)
+"""Validate nothing, for models only written by trusted code."""
+
+
+_POLICIES = {}
+_LOCAL = threading.local()
+
+_STATS_LOCK = threading.Lock()
+_STATS = defaultdict(lambda: {'validated': 0, 'seconds': 0.0, 'skipped': 0})
+
+
+def register(model, policy):
+    """Register 'policy' as the validation policy of 'model'."""
+    _POLICIES[model] = policy
+
+
+def get_policy(model):
+    """Get the validation policy of 'model'."""
+    return _POLICIES.get(model, FULL_CLEAN)
+
+
+def _skipped_models():
+    if not hasattr(_LOCAL, 'skipped'):
+        _LOCAL.skipped = []
+    return _LOCAL.skipped
+
+
+@contextmanager
+def skipped(*models):
+    """Skip validation of saves of 'models' within the block.
+
+    Only applies to the current thread, and blocks may be nested.
+    """
+    skipped_models = _skipped_models()
+    depth = len(skipped_models)
+    skipped_models.extend(models)
+    try:
+        yield
+    finally:
+        # Only drop our own models, there may be none
+        del skipped_models[depth:]
+
+
+def _record(model, key, seconds=0.0):
+    label = model._meta.label
+    with _STATS_LOCK:
+        stats = _STATS[label]
+        stats[key] += 1
+        stats['seconds'] += seconds
+
+
+def validate_on_save(instance):
+    """Validate 'instance' before it is saved, according to its policy.
+
+    Raises:
+        ValidationError: If the instance is invalid.
+    """
+    model = type(instance)
+    policy = get_policy(model)
+    if not policy.enabled or model in _skipped_models():
+        _record(model, 'skipped')
+        validation_logger.debug("Skipped validation of %s", model._meta.label)
+        return
+
+    start = time.time()
+    try:
+        policy.validate(instance)
+    finally:
+        seconds = time.time() - start
+        _record(model, 'validated', seconds)
+        validation_logger.debug(
+            "Validated %s in %.3f ms", model._meta.label, seconds * 1000
+        )
+
+
+def get_stats():
+    """Get the validation counters of this process.
+
+    Returns:
+        dict: For each model label, the number of saves validated, the total
+            seconds spent validating, and the number of saves skipped.
+    """
+    with _STATS_LOCK:
+        return dict((label, dict(stats)) for label, stats in _STATS.items())
+
+
+def reset_stats():
+    """Reset the validation counters of this process."""
+    with _STATS_LOCK:
+        _STATS.clear()
@@ -0,0 +1,105 @@
+# pylint: disable=W9903
+"""Per-module import time breakdown, for profiling process startup.
+
+Set :code:`HAGRID_IMPORT_PROFILE` to profile :code:`manage.py` or
+:code:`hagrid.wsgi`, optionally to the number of modules to report:
+
+.. code:: bash
+
+    HAGRID_IMPORT_PROFILE=30 python manage.py check
+
+Once the process has started, the slowest imports are printed to stderr,
+in the format of Python 3's :code:`-X importtime`; self time excludes the
+time spent importing other modules, while cumulative time includes it.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+# Django must not be loaded before profiling starts, so six is not used
+if sys.version_info[0] == 2:
+    import __builtin__ as builtins
+else:
+    import builtins
+
+ENVIRONMENT_VARIABLE = 'HAGRID_IMPORT_PROFILE'
+DEFAULT_LIMIT = 25
+
+_TIMINGS = []
+"""(name, self seconds, cumulative seconds) of every module imported."""
+
+_STACK = []
+"""Time spent importing children, for every import in progress."""
+
+_STATE = {'original_import': None, 'started': None}
+
+
+def _timed_import(name, *args, **kwargs):
+    """Import like :code:`__import__`, and record the time taken."""
+    original_import = _STATE['original_import']
+    fromlist = kwargs.get('fromlist', args[2] if len(args) > 2 else None)
+    label = name
+    if name in sys.modules and fromlist:
+        # Only the submodules in 'fromlist' may be new
+        label = name + '.{' + ','.join(fromlist) + '}'
+    loaded = len(sys.modules)
+
+    _STACK.append(0.0)
+    start = time.time()
+    try:
+        return original_import(name, *args, **kwargs)
+    finally:
+        cumulative = time.time() - start
+        children = _STACK.pop()
+        if _STACK:
+            _STACK[-1] += cumulative
+        # Imports of already loaded modules are not worth reporting
+        if len(sys.modules) != loaded:
+            _TIMINGS.append((label, cumulative - children, cumulative))
+
+
+def enabled():
+    """Check whether import profiling was requested."""
+    return bool(os.environ.get(ENVIRONMENT_VARIABLE))
+
+
+def install():
+    """Start timing imports, if profiling was requested."""
+    if not enabled() or _STATE['original_import'] is not None:
+        return
+    _STATE['original_import'] = builtins.__import__
+    _STATE['started'] = time.time()
+    builtins.__import__ = _timed_import
+
+
+def get_timings():
+    """Get the import timings collected so far, slowest first.
+
+    Returns:
+        list: (module name, self seconds, cumulative seconds) tuples.
+    """
+    return sorted(_TIMINGS, key=lambda timing: timing[2], reverse=True)
+
+
+def report(stream=None):
+    """Stop timing imports, and print the slowest of them to 'stream'."""
+    if _STATE['original_import'] is None:
+        return
+    builtins.__import__ = _STATE['original_import']
+    _STATE['original_import'] = None
+    stream = stream or sys.stderr
+
+    value = os.environ.get(ENVIRONMENT_VARIABLE, '')
+    limit = int(value) if value.isdigit() and int(value) > 1 else DEFAULT_LIMIT
+
+    print("import time: self [us] | cumulative | imported package",
+          file=stream)
+    for name, self_time, cumulative in get_timings()[:limit]:
+        print("import time: {:>9} | {:>10} | {}".format(
+            int(self_time * 1e6), int(cumulative * 1e6), name
+        ), file=stream)
+    print("import time: {} modules, {:.1f} ms since profiling started".format(
+        len(_TIMINGS), (time.time() - _STATE['started']) * 1000
+    ), file=stream)
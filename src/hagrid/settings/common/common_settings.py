@@ -22,7 +22,9 @@ if 'DEV' not in globals():
 # Whether we're currently testing, default = we're not.
 TESTING = False
 
-from django.utils.translation import ugettext_lazy as _
+# Mark the language names for translation, without importing the translation
+# machinery into the settings; Django translates them when displayed.
+_ = lambda s: s
 LOCALE_PATHS = (
     os.path.join(BASE_DIR, 'locale'),
 )
@@ -176,6 +178,18 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    # Ciphertexts are carried as raw bytes in MessagePack, see api.binary
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'api.binary.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'api.binary.MessagePackParser',
+    ],
     'PAGE_SIZE': 10,
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 }
@@ -188,3 +202,30 @@ STATIC_URL = '/static/'
 
 # HAGRID
 MASTER_PUBLIC_KEY = 'ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQDUcHrd+lfdEU/HIhhQ8XKc3TSeum4aL/n4LoAWmBFDLX9J7dbi7Wo2dZIm1eREoWbMilL7vp+aq8bT+IeMcRREoJ+XRIXB7F/jFO55NtjRpACKaaFXSvH9c1RcMuW1XS3ZvK944jKTsas/bObqU1ICo/LgPchwxhk6lb1JcblIIkS18zOvm/i7vb1BK63uBGy6GEwn8d+QFp9NgKbsKb3osG3mQ7VokYEt8WVyssPcahyZe+LP49LJpGOtbCewCGHnk6oAXoOHcAJknJaeQoHAZrl8NEa8JBrOkR6p/+nJSb/HoAfnkReMXNTjlzVitVNC+lkkr9CefiGtufm68qIr skeen@morphine'
+# Number of parsed public keys to keep in the per-process cache
+PUBLIC_KEY_CACHE_SIZE = 1024
+# Number of processes per worker to verify signatures with (1 = inline)
+SIGNATURE_VERIFY_WORKERS = 1
+# Smallest batch of signatures to verify in parallel, smaller are run inline
+SIGNATURE_VERIFY_MIN_BATCH = 32
+# Number of successfully verified signatures to remember per process
+SIGNATURE_CACHE_SIZE = 65536
+# Largest page size clients may request from paginated endpoints
+MAX_PAGE_SIZE = 1000
+# Most key entries accepted by a single bulk import request
+KEY_ENTRY_IMPORT_MAX = 1000
+# Number of key entries to load per query, when exporting the vault
+EXPORT_CHUNK_SIZE = 1000
+# Cache holding the recipients of each group, must be shared between workers.
+# Does not cache by default, point it at memcached or alike to enable it.
+RECIPIENT_CACHE = 'recipients'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipients': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+# Seconds before cached recipients are recomputed, bounds staleness
+RECIPIENT_CACHE_TIMEOUT = 300
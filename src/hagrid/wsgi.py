@@ -6,12 +6,20 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/1.10/howto/deployment/wsgi/
+
+Set HAGRID_IMPORT_PROFILE to print the slowest imports once the application
+is loaded, see hagrid.importtime.
 """
 
 import os
 
+from hagrid import importtime
+importtime.install()
+
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hagrid.settings")
 
 application = get_wsgi_application()
+
+importtime.report()
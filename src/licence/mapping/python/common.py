@@ -140,6 +140,15 @@
         'version': '2.2.1',
     },
 
+    'msgpack': {
+        'licence': [{
+            'SPDX': 'Apache-2.0',
+            'link': 'https://github.com/msgpack/msgpack-python/blob/v0.6.2/COPYING',
+        }],
+        'homepage': 'https://msgpack.org/',
+        'version': '0.6.2',
+    },
+
     'pika': {
         'licence': [{
             'SPDX': 'BSD-3-Clause',
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # pylint: disable=W9903
 """Tool for managing django applications."""
+import atexit
 import os
 import sys
 
@@ -15,7 +16,15 @@ def main():
         python manage.py {{TASK}}
 
     For details see the django-admin: :django:django-admin:`help`
+
+    Set :code:`HAGRID_IMPORT_PROFILE` to print the slowest imports on exit,
+    see :code:`hagrid.importtime`.
     """
+    from hagrid import importtime
+    importtime.install()
+    if importtime.enabled():
+        atexit.register(importtime.report)
+
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hagrid.settings")
     try:
         from django.core.management import execute_from_command_line
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# pylint: disable=W9903
+"""Benchmark the payload size and time of the key entry list.
+
+Run from the src directory:
+
+.. code:: bash
+
+    python tools/bench_payload.py --recipients 50 --entries 20
+
+A throwaway test database is populated with a single group of 'recipients'
+members, and 'entries' key entries owned by it. Every variant of the list
+request is then timed, and the response size reported.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import django
+
+
+VARIANTS = [
+    ('nested', '/api/keyentry/'),
+    ('normalized', '/api/keyentry/?normalize=true'),
+    ('own passwords', '/api/keyentry/?passwords=own'),
+]
+
+
+def populate(recipients, entries):
+    """Create a group of 'recipients' users, with 'entries' key entries.
+
+    Returns:
+        User: One of the members to request the list as.
+    """
+    from api.models.gen import gen_group
+    from api.models.gen import gen_key_entry
+    from api.models.gen import gen_public_key
+    from api.models.gen import gen_user
+
+    group = gen_group()
+    users = []
+    for _ in range(recipients):
+        user = gen_user()
+        gen_public_key(user=user)
+        group.user_set.add(user)
+        users.append(user)
+    for _ in range(entries):
+        gen_key_entry(owner=group)
+    return users[0]
+
+
+def bench(client, path, repeat):
+    """Time fetching 'path', and measure the response size.
+
+    Returns:
+        tuple: The size in bytes, and the best time in milliseconds.
+    """
+    response = client.get(path)
+    assert response.status_code == 200, response.status_code
+    size = len(response.content)
+    timings = timeit.repeat(lambda: client.get(path), number=1, repeat=repeat)
+    return size, min(timings) * 1000
+
+
+def main():
+    """Populate a test database, and print a table of the variants."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--recipients', type=int, default=50)
+    parser.add_argument('--entries', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.append(os.getcwd())
+    os.environ.setdefault(
+        "DJANGO_SETTINGS_MODULE",
+        "hagrid.testing_settings"
+    )
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+    from django.test.utils import setup_databases
+    from django.test.utils import teardown_databases
+    from rest_framework.test import APIClient
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        user = populate(args.recipients, args.entries)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        print("{:<16}{:>12}{:>12}".format("variant", "bytes", "ms"))
+        for name, path in VARIANTS:
+            size, millis = bench(client, path, args.repeat)
+            print("{:<16}{:>12}{:>12.1f}".format(name, size, millis))
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# pylint: disable=W9903
+"""Benchmark the cold start time of a worker.
+
+Run from the src directory:
+
+.. code:: bash
+
+    python tools/bench_startup.py --repeat 10 --budget 1000
+
+Every target is started in a fresh interpreter, 'repeat' times, and the best
+and median wall clock times are reported, along with the number of modules
+loaded. With a 'budget' in milliseconds, the exit status is non-zero if the
+best time of any target exceeds it, such that a regression fails the build.
+:code:`check.sh` only reports the times, unless :code:`STARTUP_BUDGET` is
+set to a budget.
+
+For a per-module breakdown of a slow start, see :code:`hagrid.importtime`.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+TARGETS = [
+    ('wsgi', [
+        '-c',
+        'import sys, hagrid.wsgi; sys.stdout.write(str(len(sys.modules)))'
+    ]),
+    ('manage.py', [
+        '-c',
+        'import sys, django; django.setup(); '
+        'sys.stdout.write(str(len(sys.modules)))'
+    ]),
+]
+"""The worker entry point, and the setup done by every manage.py command."""
+
+
+def bench(arguments, repeat):
+    """Start a fresh interpreter with 'arguments', 'repeat' times.
+
+    Returns:
+        tuple: The sorted timings in milliseconds, and the modules loaded.
+    """
+    environment = dict(os.environ)
+    environment.setdefault('DJANGO_SETTINGS_MODULE', 'hagrid.settings')
+    environment.pop('HAGRID_IMPORT_PROFILE', None)
+
+    timings = []
+    modules = None
+    for _ in range(repeat):
+        start = time.time()
+        modules = subprocess.check_output(
+            [sys.executable] + arguments, env=environment
+        )
+        timings.append((time.time() - start) * 1000)
+    return sorted(timings), int(modules)
+
+
+def main():
+    """Time every target, and print a table of the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=None,
+                        help='fail if the best time in ms exceeds this')
+    args = parser.parse_args()
+
+    over_budget = []
+    print("{:<12}{:>12}{:>12}{:>12}".format(
+        "target", "best ms", "median ms", "modules"
+    ))
+    for name, arguments in TARGETS:
+        timings, modules = bench(arguments, args.repeat)
+        best = timings[0]
+        median = timings[len(timings) // 2]
+        print("{:<12}{:>12.1f}{:>12.1f}{:>12}".format(
+            name, best, median, modules
+        ))
+        if args.budget is not None and best > args.budget:
+            over_budget.append(name)
+
+    if over_budget:
+        print("Over the budget of {:.0f} ms: {}".format(
+            args.budget, ", ".join(over_budget)
+        ))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# pylint: disable=W9903
+"""Benchmark JSON against MessagePack for the key entry list.
+
+Run from the src directory:
+
+.. code:: bash
+
+    python tools/bench_wire_format.py --recipients 50 --entries 20
+
+A throwaway test database is populated as in :code:`bench_payload`. The key
+entry list is then serialized once per format, both nested and normalized,
+and the size of the rendered payload is reported, along with the time to
+render and parse it.
+"""
+import argparse
+import io
+import os
+import sys
+import timeit
+
+import django
+
+
+def main():
+    """Populate a test database, and print a table of the formats."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--recipients', type=int, default=50)
+    parser.add_argument('--entries', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.append(os.getcwd())
+    os.environ.setdefault(
+        "DJANGO_SETTINGS_MODULE",
+        "hagrid.testing_settings"
+    )
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+    from django.test.utils import setup_databases
+    from django.test.utils import teardown_databases
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.test import force_authenticate
+
+    from api.binary import MessagePackParser
+    from api.binary import MessagePackRenderer
+    from api.views import KeyEntryViewSet
+    from tools.bench_payload import populate
+
+    shapes = [
+        ('nested', {}),
+        ('normalized', {'normalize': 'true'}),
+    ]
+    formats = [
+        ('json', JSONRenderer(), JSONParser()),
+        ('msgpack', MessagePackRenderer(), MessagePackParser()),
+    ]
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        user = populate(args.recipients, args.entries)
+        view = KeyEntryViewSet.as_view({'get': 'list'})
+
+        print("{:<12}{:<10}{:>12}{:>12}{:>12}".format(
+            "shape", "format", "bytes", "render ms", "parse ms"
+        ))
+        for shape, params in shapes:
+            for name, renderer, parser in formats:
+                request = APIRequestFactory().get(
+                    '/api/keyentry/', params, HTTP_ACCEPT=renderer.media_type
+                )
+                force_authenticate(request, user)
+                # Serialized by the view, rendered and parsed below
+                data = view(request).data
+                content = renderer.render(data)
+
+                render = min(timeit.repeat(
+                    lambda: renderer.render(data),
+                    number=1, repeat=args.repeat
+                ))
+                parse = min(timeit.repeat(
+                    lambda: parser.parse(io.BytesIO(content)),
+                    number=1, repeat=args.repeat
+                ))
+                print("{:<12}{:<10}{:>12}{:>12.1f}{:>12.1f}".format(
+                    shape, name, len(content), render * 1000, parse * 1000
+                ))
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()